@@ -0,0 +1,59 @@
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from models import BulkItemResult, BulkCreateResult
+
+MAX_BULK_SIZE = 1000
+
+def _validation_message(error: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+async def bulk_insert(repository, create_model, model, items, before_insert=None):
+    """Validate each item on its own and write the valid ones with one unordered insert_many.
+
+    before_insert, if given, is awaited with the validated create payloads
+    and may fill in fields the stored model requires, such as allocated
+    numbers, before the documents are built. Returns the per-item report and
+    the documents that were actually inserted.
+    """
+    if len(items) > MAX_BULK_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_SIZE} items per request")
+
+    results = []
+    payloads = []
+    positions = []
+    for index, item in enumerate(items):
+        try:
+            payloads.append(create_model(**item).dict())
+        except ValidationError as e:
+            results.append(BulkItemResult(index=index, success=False, error=_validation_message(e)))
+            continue
+        positions.append(index)
+
+    if payloads and before_insert:
+        await before_insert(payloads)
+    docs = [model(**payload).dict() for payload in payloads]
+
+    # Errors are keyed by position in the docs list
+    write_errors = {}
+    if docs:
+        write_errors = await repository.insert_many(docs)
+
+    inserted_docs = []
+    for doc_index, (index, doc) in enumerate(zip(positions, docs)):
+        if doc_index in write_errors:
+            results.append(BulkItemResult(index=index, success=False, error=write_errors[doc_index]))
+        else:
+            results.append(BulkItemResult(index=index, success=True, id=doc["id"]))
+            inserted_docs.append(doc)
+
+    results.sort(key=lambda result: result.index)
+    report = BulkCreateResult(
+        inserted=len(inserted_docs),
+        failed=len(results) - len(inserted_docs),
+        results=results
+    )
+    return report, inserted_docs
@@ -0,0 +1,64 @@
+import os
+import time
+from collections import OrderedDict
+
+ENTITY_CACHE_SIZE = int(os.environ.get("ENTITY_CACHE_SIZE", "1024"))
+ENTITY_CACHE_TTL_SECONDS = float(os.environ.get("ENTITY_CACHE_TTL_SECONDS", "30"))
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries also expire after a fixed TTL.
+
+    Only used from the event loop, so no locking is needed. The TTL bounds
+    how stale an entry can get when another worker process writes it.
+    """
+
+    def __init__(self, maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
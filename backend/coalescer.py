@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from database import percentile
+from repository import DuplicateDocument
+
+logger = logging.getLogger(__name__)
+
+# Write-behind batching for single-document creates. Off by default: with
+# INSERT_COALESCE_ENABLED=1, concurrent create requests are gathered for up
+# to INSERT_COALESCE_MAX_DELAY_MS, or until INSERT_COALESCE_MAX_BATCH
+# documents are waiting, and written with one insert_many.
+INSERT_COALESCE_ENABLED = os.environ.get("INSERT_COALESCE_ENABLED", "0") == "1"
+INSERT_COALESCE_MAX_BATCH = int(os.environ.get("INSERT_COALESCE_MAX_BATCH", "100"))
+INSERT_COALESCE_MAX_DELAY_MS = float(os.environ.get("INSERT_COALESCE_MAX_DELAY_MS", "2"))
+
+class InsertCoalescer:
+    """Batches concurrent repository inserts into unordered insert_many calls.
+
+    insert() returns once the caller's own document is written and raises
+    for that document alone: DuplicateDocument for its write error, or
+    whatever insert_many raised for the batch as a whole. A lone request
+    pays up to max_delay_ms extra latency, in exchange for bursts sharing
+    round trips. A caller cancelled while waiting does not withdraw its
+    document, much as a cancelled insert_one may still reach the server.
+    Only used from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, repository, max_batch=INSERT_COALESCE_MAX_BATCH,
+                 max_delay_ms=INSERT_COALESCE_MAX_DELAY_MS, history=1000):
+        self.repository = repository
+        self.max_batch = max(max_batch, 1)
+        self.max_delay = max_delay_ms / 1000
+        self._pending = []
+        self._timer = None
+        self._flushes = set()
+        self.batches = 0
+        self.documents = 0
+        self.failed_batches = 0
+        self.max_batch_seen = 0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.recent_batch_sizes = deque(maxlen=history)
+        self.recent_flush_ms = deque(maxlen=history)
+
+    async def insert(self, doc):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((doc, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            errors = await self.repository.insert_many([doc for doc, _ in batch])
+        except Exception as e:
+            self.failed_batches += 1
+            logger.exception("Coalesced insert of %d %s failed", len(batch), self.repository.name)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._record(len(batch), (time.perf_counter() - start) * 1000)
+
+        for position, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if position in errors:
+                future.set_exception(DuplicateDocument(errors[position]))
+            else:
+                future.set_result(None)
+
+    def _record(self, size, flush_ms):
+        self.batches += 1
+        self.documents += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        self.total_flush_ms += flush_ms
+        self.max_flush_ms = max(self.max_flush_ms, flush_ms)
+        self.recent_batch_sizes.append(size)
+        self.recent_flush_ms.append(flush_ms)
+
+    async def close(self):
+        """Write whatever is still waiting and wait for in-flight batches."""
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def metrics(self):
+        sizes = sorted(self.recent_batch_sizes)
+        flush_ms = sorted(self.recent_flush_ms)
+        return {
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+            "pending": len(self._pending),
+            "in_flight": len(self._flushes),
+            "batches": self.batches,
+            "documents": self.documents,
+            "failed_batches": self.failed_batches,
+            "batch_size": {
+                "avg": round(self.documents / self.batches, 2) if self.batches else 0.0,
+                "max": self.max_batch_seen,
+                "p50": percentile(sizes, 50),
+                "p95": percentile(sizes, 95),
+            },
+            "flush_ms": {
+                "avg": round(self.total_flush_ms / self.batches, 3) if self.batches else 0.0,
+                "max": round(self.max_flush_ms, 3),
+                "p50": round(percentile(flush_ms, 50), 3),
+                "p95": round(percentile(flush_ms, 95), 3),
+                "p99": round(percentile(flush_ms, 99), 3),
+            },
+        }
@@ -0,0 +1,45 @@
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+# Conditional GET support. Detail ETags hash the document itself; list ETags
+# hash a per-collection modification marker that every API write bumps, so a
+# poller holding a current ETag gets a 304 without the list query running.
+# Writes made directly against the database, bypassing the API, do not bump
+# the marker.
+def _marker_id(collection_name):
+    return f"modified:{collection_name}"
+
+async def touch_collection(stats_store, collection_name):
+    await stats_store.increment(_marker_id(collection_name), {"version": 1}, timestamp_field="modified_at")
+
+async def collection_version(stats_store, collection_name):
+    doc = await stats_store.get(_marker_id(collection_name))
+    return doc["version"] if doc else 0
+
+def _etag(payload):
+    digest = hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+async def list_etag(stats_store, collection_name, request: Request):
+    """ETag for a list response: the collection's marker plus the query string."""
+    version = await collection_version(stats_store, collection_name)
+    return _etag(f"{collection_name}:{version}:{request.url.query}")
+
+def doc_etag(doc, selected=None):
+    fields = selected or sorted(field for field in doc if field != "_id")
+    return _etag(json.dumps([[field, doc.get(field)] for field in fields], default=str))
+
+def is_not_modified(request: Request, etag):
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" match each other
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def not_modified_response(etag):
+    return Response(status_code=304, headers={"ETag": etag})
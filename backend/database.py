@@ -0,0 +1,178 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+# Readiness pings give up after this long rather than waiting out server selection
+READY_PING_TIMEOUT_SECONDS = float(os.environ.get("MONGO_READY_PING_TIMEOUT_SECONDS", "2"))
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+@dataclass(frozen=True)
+class MongoSettings:
+    """Connection and pool settings, read from the environment by from_env().
+
+    timeout_ms is pymongo's per-operation time limit (timeoutMS): it bounds
+    server selection, pool checkout and the command itself. It applies to
+    every operation on the client, exports and index builds included, so it
+    is off unless MONGO_TIMEOUT_MS is set.
+    """
+    url: str
+    db_name: str
+    max_pool_size: int = 100
+    min_pool_size: int = 10
+    max_idle_time_ms: int = 300000
+    server_selection_timeout_ms: int = 5000
+    timeout_ms: Optional[int] = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            url=os.environ['MONGO_URL'],
+            db_name=os.environ['DB_NAME'],
+            max_pool_size=_env_int("MONGO_MAX_POOL_SIZE", cls.max_pool_size),
+            min_pool_size=_env_int("MONGO_MIN_POOL_SIZE", cls.min_pool_size),
+            max_idle_time_ms=_env_int("MONGO_MAX_IDLE_TIME_MS", cls.max_idle_time_ms),
+            server_selection_timeout_ms=_env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS",
+                                                 cls.server_selection_timeout_ms),
+            timeout_ms=_env_int("MONGO_TIMEOUT_MS", None),
+        )
+
+    def client_options(self):
+        options = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": min(self.min_pool_size, self.max_pool_size),
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+        }
+        if self.timeout_ms:
+            options["timeoutMS"] = self.timeout_ms
+        return options
+
+def connect(settings, event_listeners=()):
+    """Create the Motor client; nothing is sent to the server until first use."""
+    return AsyncIOMotorClient(settings.url, event_listeners=list(event_listeners), **settings.client_options())
+
+async def warm_pool(db, size):
+    """Open `size` pooled connections up front with concurrent pings.
+
+    pymongo only tops the pool up to minPoolSize from its background
+    maintenance pass, so without this the first burst of requests pays for
+    the TCP and auth handshakes.
+    """
+    await asyncio.gather(*(db.command("ping") for _ in range(max(size, 1))))
+
+def _now_ms():
+    return time.perf_counter() * 1000
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """pymongo pool listener tracking connections and checkout wait times.
+
+    A checkout's started and checked-out events fire on the same driver
+    thread, so the start time is kept in a thread-local and the wait is the
+    time between them: that is how long an operation queued for a free
+    connection before it could be sent. Recent waits are kept for
+    percentiles; the counters are guarded by a lock since listener callbacks
+    run on many threads.
+    """
+
+    def __init__(self, history=1000):
+        self.open_connections = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = defaultdict(int)
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.pool_clears = 0
+        self.recent_waits_ms = deque(maxlen=history)
+        self._started = threading.local()
+        self._lock = threading.Lock()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        self._started.at = _now_ms()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_check_out_failed(self, event):
+        wait_ms = self._wait_ms()
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures[str(event.reason)] += 1
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_checked_out(self, event):
+        wait_ms = self._wait_ms()
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.recent_waits_ms.append(wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def _wait_ms(self):
+        started = getattr(self._started, "at", None)
+        self._started.at = None
+        return _now_ms() - started if started is not None else 0.0
+
+    def report(self):
+        with self._lock:
+            waits = sorted(self.recent_waits_ms)
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pool_clears": self.pool_clears,
+                "wait_ms": {
+                    "avg": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                    "max": round(self.max_wait_ms, 3),
+                    "p50": round(percentile(waits, 50), 3),
+                    "p95": round(percentile(waits, 95), 3),
+                    "p99": round(percentile(waits, 99), 3),
+                },
+            }
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+MONGO_SLOW_QUERY_MS = float(os.environ.get("MONGO_SLOW_QUERY_MS", "100"))
+# Fraction of slow read commands whose query plan is captured with explain
+MONGO_EXPLAIN_SAMPLE_RATE = float(os.environ.get("MONGO_EXPLAIN_SAMPLE_RATE", "0"))
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+# Session and transport fields that explain does not accept
+_UNEXPLAINABLE_FIELDS = {"lsid", "txnNumber", "readConcern", "writeConcern"}
+# Monitoring commands the driver sends on its own; not worth recording
+_IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue",
+                     "endSessions", "killCursors", "explain"}
+
+class CommandStats:
+    __slots__ = ("count", "failures", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+def _summarize_plan(plan):
+    """Flatten a winning plan into its stage chain, e.g. LIMIT > FETCH > IXSCAN(id_unique)."""
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " > ".join(stages)
+
+def _winning_plan(explain_result):
+    planner = explain_result.get("queryPlanner")
+    if planner is None:
+        # aggregate explains nest the planner under the $cursor stage
+        for stage in explain_result.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"].get("queryPlanner")
+                break
+    planner = planner or {}
+    plan = planner.get("winningPlan", {})
+    return plan.get("queryPlan", plan)
+
+class CommandMonitor(monitoring.CommandListener):
+    """pymongo command listener timing every command per collection.
+
+    Listener callbacks run on the driver's worker threads, so the counters
+    are guarded by a lock and explain() is handed back to the event loop.
+    Commands slower than slow_ms are logged and kept in a short history;
+    a sampled fraction of slow reads also gets its query plan captured.
+    """
+
+    def __init__(self, slow_ms=MONGO_SLOW_QUERY_MS, explain_sample_rate=MONGO_EXPLAIN_SAMPLE_RATE,
+                 history=50):
+        self.slow_ms = slow_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.stats = defaultdict(CommandStats)
+        self.slow_queries = deque(maxlen=history)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._db = None
+
+    def attach(self, loop, db):
+        """Enable explain capture; needs the event loop and database the app runs on."""
+        self._loop = loop
+        self._db = db
+
+    def started(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        # Most commands name their collection as the command's value; getMore
+        # carries the cursor id there and the collection in "collection"
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(key)
+        if not isinstance(collection, str):
+            collection = "-"
+        with self._lock:
+            self._pending[event.request_id] = (collection, event.command_name, event.database_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+            if pending is None:
+                return
+            collection, command_name, database_name, command = pending
+            duration_ms = event.duration_micros / 1000
+            stats = self.stats[(collection, command_name)]
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            if failed:
+                stats.failures += 1
+
+        if duration_ms >= self.slow_ms:
+            self._record_slow(collection, command_name, database_name, command, duration_ms)
+
+    def _record_slow(self, collection, command_name, database_name, command, duration_ms):
+        shape = {key: command[key] for key in ("filter", "sort", "pipeline", "query", "q", "updates", "deletes")
+                 if key in command}
+        entry = {
+            "at": datetime.utcnow(),
+            "collection": collection,
+            "command": command_name,
+            "duration_ms": round(duration_ms, 3),
+            "shape": repr(shape)[:1000],
+            "plan": None,
+        }
+        logger.warning("Slow MongoDB %s on %s: %.1f ms %s", command_name, collection, duration_ms, entry["shape"])
+        with self._lock:
+            self.slow_queries.append(entry)
+
+        if (command_name in EXPLAINABLE_COMMANDS and self._loop is not None
+                and database_name == self._db.name and random.random() < self.explain_sample_rate):
+            explainable = {key: value for key, value in command.items()
+                           if not key.startswith("$") and key not in _UNEXPLAINABLE_FIELDS}
+            asyncio.run_coroutine_threadsafe(self._explain(entry, explainable), self._loop)
+
+    async def _explain(self, entry, command):
+        try:
+            result = await self._db.command({"explain": command, "verbosity": "queryPlanner"})
+            entry["plan"] = _summarize_plan(_winning_plan(result))
+        except Exception as e:
+            entry["plan"] = f"explain failed: {e}"
+
+    def report(self):
+        with self._lock:
+            commands = [
+                {
+                    "collection": collection,
+                    "command": command_name,
+                    "count": stats.count,
+                    "failures": stats.failures,
+                    "total_ms": round(stats.total_ms, 3),
+                    "avg_ms": round(stats.total_ms / stats.count, 3) if stats.count else 0.0,
+                    "max_ms": round(stats.max_ms, 3),
+                }
+                for (collection, command_name), stats in self.stats.items()
+            ]
+            slow_queries = list(self.slow_queries)
+        commands.sort(key=lambda row: -row["total_ms"])
+        return {
+            "slow_threshold_ms": self.slow_ms,
+            "explain_sample_rate": self.explain_sample_rate,
+            "commands": commands,
+            "slow_queries": slow_queries,
+        }
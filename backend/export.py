@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi.responses import StreamingResponse
+
+from query import ListQuery
+
+# Documents are pulled from the repository scan in batches of this size and
+# each batch is written out as one chunk, so memory stays flat however large
+# the collection is.
+EXPORT_BATCH_SIZE = 500
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def _batches(cursor):
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def stream_ndjson(cursor, fields):
+    async for batch in _batches(cursor):
+        yield "".join(
+            json.dumps({field: doc.get(field) for field in fields}, default=_json_default) + "\n"
+            for doc in batch
+        )
+
+async def stream_csv(cursor, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue()
+    async for batch in _batches(cursor):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(doc.get(field)) for field in fields] for doc in batch)
+        yield buffer.getvalue()
+
+def export_response(repository, model, list_query: ListQuery, export_format, name, cursor=None):
+    """Stream a repository's matches in (sort field, id) order as NDJSON or CSV with the model's fields.
+
+    cursor is a list endpoint page cursor to resume from.
+    """
+    fields = list(model.model_fields)
+    documents = repository.scan(list_query, cursor, projection={"_id": 0}, batch_size=EXPORT_BATCH_SIZE)
+    stream = stream_csv if export_format == "csv" else stream_ndjson
+    return StreamingResponse(
+        stream(documents, fields),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'}
+    )
@@ -0,0 +1,39 @@
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import create_model
+
+# Sparse fieldsets: ?fields=name,status,amount becomes a MongoDB projection
+# and a trimmed response model holding only those fields. "id" is always
+# returned so rows stay addressable.
+def parse_fields(model, fields: Optional[str]):
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *requested]))
+
+def projection_for(selected, *extra_fields):
+    """Projection for the selected fields plus any the query itself needs (e.g. the sort key)."""
+    if selected is None:
+        return None
+    return {"_id": 0, **{field: 1 for field in (*selected, *extra_fields)}}
+
+@lru_cache(maxsize=256)
+def sparse_model(model, selected):
+    definitions = {
+        field: (Optional[model.model_fields[field].annotation], None)
+        for field in selected
+    }
+    return create_model(f"{model.__name__}Fields", **definitions)
+
+def trim_docs(model, selected, docs):
+    trimmed = sparse_model(model, selected)
+    return jsonable_encoder([trimmed(**doc) for doc in docs])
+
+def trim_doc(model, selected, doc):
+    return trim_docs(model, selected, [doc])[0]
@@ -0,0 +1,156 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Indexes backing the hot paths in server.py, keyed by collection name:
+# - unique "id" for every find_one/update_one/delete_one by id
+# - unique invoice_number, so the sequence allocator can never hand out a
+#   number that is already taken
+# - (equality fields..., sort key, id) for the keyset-paginated list
+#   endpoints; query.py only accepts filter/sort combinations one of these
+#   serves. The status-prefixed ones also serve the dashboard counts.
+# - one weighted text index per collection for /api/search
+# - (kind, month) and (kind, client, month) for the invoice rollup buckets
+INDEXES = {
+    "clients": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("join_date", DESCENDING), ("id", DESCENDING)], name="join_date_id"),
+        IndexModel([("name", ASCENDING), ("id", ASCENDING)], name="name_id"),
+        IndexModel([("company", ASCENDING), ("join_date", DESCENDING), ("id", DESCENDING)],
+                   name="company_join_date_id"),
+        IndexModel([("name", TEXT), ("email", TEXT), ("company", TEXT)], name="text_search",
+                   weights={"name": 10, "company": 5, "email": 2}),
+    ],
+    "projects": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_date", DESCENDING), ("id", DESCENDING)], name="created_date_id"),
+        IndexModel([("budget", DESCENDING), ("id", DESCENDING)], name="budget_id"),
+        IndexModel([("status", ASCENDING), ("created_date", DESCENDING), ("id", DESCENDING)],
+                   name="status_created_date_id"),
+        IndexModel([("client", ASCENDING), ("created_date", DESCENDING), ("id", DESCENDING)],
+                   name="client_created_date_id"),
+        IndexModel([("name", TEXT), ("description", TEXT)], name="text_search",
+                   weights={"name": 10, "description": 1}),
+    ],
+    "invoices": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_date", DESCENDING), ("id", DESCENDING)], name="created_date_id"),
+        IndexModel([("invoice_number", ASCENDING)], name="invoice_number_unique", unique=True),
+        IndexModel([("due_date", DESCENDING), ("id", DESCENDING)], name="due_date_id"),
+        IndexModel([("amount", DESCENDING), ("id", DESCENDING)], name="amount_id"),
+        IndexModel([("status", ASCENDING), ("created_date", DESCENDING), ("id", DESCENDING)],
+                   name="status_created_date_id"),
+        IndexModel([("status", ASCENDING), ("due_date", DESCENDING), ("id", DESCENDING)],
+                   name="status_due_date_id"),
+        IndexModel([("client", ASCENDING), ("created_date", DESCENDING), ("id", DESCENDING)],
+                   name="client_created_date_id"),
+        IndexModel([("client", ASCENDING), ("status", ASCENDING), ("created_date", DESCENDING),
+                    ("id", DESCENDING)], name="client_status_created_date_id"),
+        IndexModel([("project", ASCENDING), ("created_date", DESCENDING), ("id", DESCENDING)],
+                   name="project_created_date_id"),
+        IndexModel([("invoice_number", TEXT), ("description", TEXT)], name="text_search",
+                   weights={"invoice_number": 10, "description": 1}),
+    ],
+    "invoice_rollups": [
+        IndexModel([("kind", ASCENDING), ("month", ASCENDING)], name="kind_month"),
+        IndexModel([("kind", ASCENDING), ("client", ASCENDING), ("month", ASCENDING)],
+                   name="kind_client_month"),
+    ],
+}
+
+# Indexes we used to manage and that a compound index above now covers;
+# ensure_indexes drops them.
+RETIRED_INDEXES = {
+    "projects": ["status"],
+    "invoices": ["status"],
+}
+
+def index_keys(model):
+    return list(model.document["key"])
+
+def _matches(existing, model):
+    wanted = model.document
+    if TEXT in wanted["key"].values():
+        # The server stores text indexes as {_fts, _ftsx} plus the field weights
+        return existing.get("weights") == wanted["weights"]
+    return (
+        list(existing["key"]) == list(wanted["key"].items())
+        and bool(existing.get("unique")) == bool(wanted.get("unique"))
+    )
+
+async def ensure_indexes(db, before_create=None):
+    """Create missing indexes and rebuild any whose definition has drifted.
+
+    before_create maps (collection, index name) to a coroutine function run
+    just before that index is built, e.g. to clear duplicates out of the way
+    of a unique index. A unique index that still fails to build raises, so
+    the app does not start without the guarantee it relies on.
+
+    Indexes listed in RETIRED_INDEXES are dropped. Any other index that is
+    not declared in INDEXES is left alone and only logged, since it may have
+    been added by hand on the cluster.
+    """
+    before_create = before_create or {}
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+
+        to_create = []
+        for model in models:
+            name = model.document["name"]
+            if name not in existing:
+                to_create.append(model)
+            elif not _matches(existing[name], model):
+                logger.warning("Rebuilding index %s.%s: definition changed", collection_name, name)
+                await collection.drop_index(name)
+                to_create.append(model)
+
+        for model in to_create:
+            name = model.document["name"]
+            prepare = before_create.get((collection_name, name))
+            if prepare is not None:
+                await prepare()
+            try:
+                await collection.create_indexes([model])
+                logger.info("Created index %s.%s", collection_name, name)
+            except OperationFailure as e:
+                if model.document.get("unique"):
+                    raise RuntimeError(
+                        f"Could not create unique index {collection_name}.{name}; "
+                        f"remove the duplicate values and restart: {e}"
+                    ) from e
+                logger.error("Could not create index %s.%s: %s", collection_name, name, e)
+
+        for name in RETIRED_INDEXES.get(collection_name, []):
+            if name in existing:
+                logger.info("Dropping retired index %s.%s", collection_name, name)
+                await collection.drop_index(name)
+                del existing[name]
+
+        declared = {m.document["name"] for m in models} | {"_id_"}
+        unmanaged = sorted(set(existing) - declared)
+        if unmanaged:
+            logger.info("Unmanaged indexes on %s: %s", collection_name, ", ".join(unmanaged))
+
+async def index_usage(db):
+    """Report per-index access counts from $indexStats for each managed collection."""
+    report = {}
+    for collection_name, models in INDEXES.items():
+        stats = await db[collection_name].aggregate([{"$indexStats": {}}]).to_list(None)
+        present = {s["name"] for s in stats}
+        report[collection_name] = {
+            "indexes": [
+                {
+                    "name": s["name"],
+                    "key": dict(s["key"]),
+                    "ops": s["accesses"]["ops"],
+                    "since": s["accesses"]["since"],
+                }
+                for s in sorted(stats, key=lambda s: s["name"])
+            ],
+            "missing": [m.document["name"] for m in models if m.document["name"] not in present],
+        }
+    return report
@@ -0,0 +1,414 @@
+import re
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+from indexes import INDEXES, index_keys
+from pagination import decode_cursor, encode_cursor, naive_utc
+from query import ListQuery
+from reports import UNPAID_STATUSES, aging_bucket
+from repository import (
+    ClientRepository, CounterStore, DuplicateDocument, InvoiceRepository, Repository, RollupStore, Storage
+)
+from rollups import invoice_month
+
+# In-process implementation of the storage interfaces: documents live in a
+# dict keyed by id and every (equality..., sort key, id) index declared in
+# indexes.py is mirrored as a sorted list of key tuples, so the list, export
+# and sweeper queries are bisect range scans here just as they are index
+# range scans in MongoDB. Nothing is persisted.
+
+# Values are compared in MongoDB's cross-type order (null < numbers <
+# strings < dates) so mixed or missing fields never raise on comparison, and
+# timezone-aware dates compare as the naive UTC values they are stored as
+def _order(value):
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, naive_utc(value))
+    return (4, str(value))
+
+# Sentinels sorting below and above every _order() value
+_BOTTOM = (-1,)
+_TOP = (9,)
+
+_RANGE_OPS = {"$gt", "$gte", "$lt", "$lte"}
+
+def _matches(doc, query):
+    for field, condition in (query or {}).items():
+        value = _order(doc.get(field))
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            for op, operand in condition.items():
+                if op == "$in":
+                    if value not in {_order(item) for item in operand}:
+                        return False
+                elif op == "$ne":
+                    if value == _order(operand):
+                        return False
+                elif op == "$gt" and not value > _order(operand):
+                    return False
+                elif op == "$gte" and not value >= _order(operand):
+                    return False
+                elif op == "$lt" and not value < _order(operand):
+                    return False
+                elif op == "$lte" and not value <= _order(operand):
+                    return False
+        elif value != _order(condition):
+            return False
+    return True
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    included = [field for field, flag in projection.items() if flag and field != "_id"]
+    if included:
+        return {field: doc[field] for field in included if field in doc}
+    return {field: value for field, value in doc.items() if projection.get(field, 1)}
+
+def _tokens(text):
+    return re.findall(r"\w+", str(text).lower())
+
+class SortedIndex:
+    """Key tuples (field values..., id) kept sorted for bisect range scans."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.keys = []
+
+    def key(self, doc):
+        return tuple(_order(doc.get(field)) for field in self.fields)
+
+    def add(self, doc):
+        insort(self.keys, self.key(doc))
+
+    def remove(self, doc):
+        key = self.key(doc)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def scan(self, prefix, lower=None, upper=None, after=None, direction=-1, limit=None):
+        """Ids under an equality prefix, the next field bounded by (op, value) pairs, in order.
+
+        after is a (sort value, id) keyset position to continue from in
+        the scan direction; at most limit ids are returned.
+        """
+        prefix = tuple(_order(value) for value in prefix)
+        start = bisect_left(self.keys, prefix + (_BOTTOM,))
+        end = bisect_right(self.keys, prefix + (_TOP,))
+        if lower is not None:
+            op, value = lower
+            bound = prefix + (_order(value),) + ((_BOTTOM,) if op == "$gte" else (_TOP,))
+            start = max(start, bisect_left(self.keys, bound))
+        if upper is not None:
+            op, value = upper
+            bound = prefix + (_order(value),) + ((_TOP,) if op == "$lte" else (_BOTTOM,))
+            end = min(end, bisect_right(self.keys, bound))
+        if after is not None:
+            bound = prefix + (_order(after[0]), _order(after[1]))
+            if direction < 0:
+                end = min(end, bisect_left(self.keys, bound))
+            else:
+                start = max(start, bisect_right(self.keys, bound))
+
+        if end <= start:
+            return []
+        if limit is not None:
+            if direction < 0:
+                start = max(start, end - limit)
+            else:
+                end = min(end, start + limit)
+        keys = self.keys[start:end]
+        if direction < 0:
+            keys.reverse()
+        return [key[-1][1] for key in keys]
+
+class InMemoryRepository(Repository):
+    def __init__(self, name):
+        super().__init__(name)
+        self.docs = {}
+        self.indexes = []
+        self.unique_fields = []
+        self.text_weights = {}
+        for model in INDEXES.get(name, []):
+            keys = index_keys(model)
+            if "weights" in model.document:
+                self.text_weights = model.document["weights"]
+            elif model.document.get("unique"):
+                if keys != ["id"]:
+                    self.unique_fields.append(keys[0])
+            elif keys[-1] == "id":
+                self.indexes.append(SortedIndex(keys))
+        self.unique_values = {field: {} for field in self.unique_fields}
+
+    def _check_unique(self, doc, doc_id):
+        for field in self.unique_fields:
+            owner = self.unique_values[field].get(doc.get(field))
+            if doc.get(field) is not None and owner is not None and owner != doc_id:
+                raise DuplicateDocument(f"duplicate key on {self.name}.{field}: {doc[field]!r}")
+
+    def _add(self, doc):
+        self.docs[doc["id"]] = doc
+        for field in self.unique_fields:
+            if doc.get(field) is not None:
+                self.unique_values[field][doc[field]] = doc["id"]
+        for index in self.indexes:
+            index.add(doc)
+
+    def _remove(self, doc):
+        del self.docs[doc["id"]]
+        for field in self.unique_fields:
+            self.unique_values[field].pop(doc.get(field), None)
+        for index in self.indexes:
+            index.remove(doc)
+
+    def _plan(self, list_query):
+        """The index serving the query's equality fields and sort key, or None."""
+        query = list_query.filter
+        equality = {field for field, condition in query.items() if not isinstance(condition, dict)}
+        ranged = set(query) - equality
+        if ranged - {list_query.sort_field}:
+            return None
+        if ranged and not set(query[list_query.sort_field]) <= _RANGE_OPS:
+            return None
+        for index in self.indexes:
+            if set(index.fields[:-2]) == equality and index.fields[-2] == list_query.sort_field:
+                return index
+        return None
+
+    def _ids(self, list_query, cursor=None, limit=None):
+        sort_field, direction = list_query.sort_field, list_query.direction
+        after = decode_cursor(cursor, sort_field, direction) if cursor else None
+        index = self._plan(list_query)
+        if index is not None:
+            query = list_query.filter
+            bounds = query.get(sort_field, {})
+            lower = next(((op, bounds[op]) for op in ("$gt", "$gte") if op in bounds), None)
+            upper = next(((op, bounds[op]) for op in ("$lt", "$lte") if op in bounds), None)
+            prefix = [query[field] for field in index.fields[:-2]]
+            return index.scan(prefix, lower, upper, after, direction, limit)
+
+        # No matching index: filter and sort everything, as a collection scan would
+        def position(doc):
+            return (_order(doc.get(sort_field)), _order(doc["id"]))
+
+        docs = [doc for doc in self.docs.values() if _matches(doc, list_query.filter)]
+        if after is not None:
+            after = (_order(after[0]), _order(after[1]))
+            if direction < 0:
+                docs = [doc for doc in docs if position(doc) < after]
+            else:
+                docs = [doc for doc in docs if position(doc) > after]
+        docs.sort(key=position, reverse=direction < 0)
+        return [doc["id"] for doc in docs[:limit]]
+
+    async def get(self, doc_id, projection=None):
+        doc = self.docs.get(doc_id)
+        return _project(doc, projection) if doc is not None else None
+
+    async def insert(self, doc):
+        if doc["id"] in self.docs:
+            raise DuplicateDocument(f"duplicate key on {self.name}.id: {doc['id']!r}")
+        self._check_unique(doc, doc["id"])
+        self._add(dict(doc))
+
+    async def insert_many(self, docs):
+        errors = {}
+        for position, doc in enumerate(docs):
+            try:
+                await self.insert(doc)
+            except DuplicateDocument as e:
+                errors[position] = str(e)
+        return errors
+
+    async def update(self, doc_id, changes, return_before=False):
+        before = self.docs.get(doc_id)
+        if before is None:
+            return None
+        after = {**before, **changes}
+        self._check_unique(after, doc_id)
+        self._remove(before)
+        self._add(after)
+        return dict(before if return_before else after)
+
+    async def update_many(self, doc_ids, changes, only_if=None):
+        modified = 0
+        for doc_id in doc_ids:
+            doc = self.docs.get(doc_id)
+            if doc is None or not _matches(doc, only_if):
+                continue
+            if any(doc.get(field) != value for field, value in changes.items()):
+                await self.update(doc_id, changes)
+                modified += 1
+        return modified
+
+    async def delete(self, doc_id):
+        doc = self.docs.get(doc_id)
+        if doc is None:
+            return None
+        self._remove(doc)
+        return doc
+
+    async def page(self, list_query, limit, cursor=None, projection=None):
+        # One extra id tells whether another page exists
+        ids = self._ids(list_query, cursor, limit + 1)
+        docs = [_project(self.docs[doc_id], projection) for doc_id in ids[:limit]]
+        next_cursor = None
+        if len(ids) > limit:
+            next_cursor = encode_cursor(self.docs[ids[limit - 1]], list_query.sort_field, list_query.direction)
+        return docs, next_cursor
+
+    async def scan(self, list_query, cursor=None, projection=None, batch_size=None):
+        for doc_id in self._ids(list_query, cursor):
+            doc = self.docs.get(doc_id)
+            if doc is not None:
+                yield _project(doc, projection)
+
+    async def count(self, query=None):
+        if not query:
+            return len(self.docs)
+        return sum(1 for doc in self.docs.values() if _matches(doc, query))
+
+    async def total(self, field, query=None):
+        return sum(doc.get(field) or 0 for doc in self.docs.values() if _matches(doc, query))
+
+    async def search(self, q, page, limit):
+        # Term matching over the text index fields, weighted like the text
+        # index; there is no stemming, so only whole words match
+        terms = set(_tokens(q))
+        scored = []
+        for doc in self.docs.values():
+            score = sum(
+                weight * sum(1 for token in _tokens(doc.get(field) or "") if token in terms)
+                for field, weight in self.text_weights.items()
+            )
+            if score:
+                scored.append((score, doc))
+        scored.sort(key=lambda match: (-match[0], match[1]["id"]))
+        start = (page - 1) * limit
+        matches = scored[start:start + limit + 1]
+        docs = [{**doc, "score": score} for score, doc in matches[:limit]]
+        return docs, len(matches) > limit
+
+class InMemoryClientRepository(InMemoryRepository, ClientRepository):
+    async def summary(self, client_id, projects, invoices):
+        client = await self.get(client_id, {"_id": 0})
+        if client is None:
+            return None
+        by_client = ListQuery({"client": client["name"]}, "created_date", -1)
+        client_projects = [doc async for doc in projects.scan(by_client, projection={"_id": 0})]
+        client_invoices = [doc async for doc in invoices.scan(by_client, projection={"_id": 0})]
+        return {
+            "client": client,
+            "projects": client_projects,
+            "invoices": client_invoices,
+            "total_invoiced": sum(doc.get("amount") or 0 for doc in client_invoices),
+            "outstanding_balance": sum(
+                doc.get("amount") or 0 for doc in client_invoices if doc.get("status") in UNPAID_STATUSES
+            ),
+        }
+
+class InMemoryInvoiceRepository(InMemoryRepository, InvoiceRepository):
+    async def aging_groups(self, as_of):
+        by_client = {}
+        totals = {}
+        projection = {"_id": 0, "client": 1, "amount": 1, "due_date": 1}
+        # One scan per status walks the (status, due_date, id) index
+        for status in UNPAID_STATUSES:
+            async for doc in self.scan(ListQuery({"status": status}, "due_date", 1), projection=projection):
+                bucket = aging_bucket(doc.get("due_date"), as_of)
+                amount = doc.get("amount") or 0
+                for groups, key in ((by_client, (doc.get("client"), bucket)), (totals, bucket)):
+                    group = groups.setdefault(key, {"amount": 0, "count": 0})
+                    group["amount"] += amount
+                    group["count"] += 1
+        return {
+            "by_client": [{"_id": {"client": client, "bucket": bucket}, **group}
+                          for (client, bucket), group in by_client.items()],
+            "totals": [{"_id": bucket, **group} for bucket, group in totals.items()],
+        }
+
+    async def rollup_groups(self):
+        groups = {}
+        for doc in self.docs.values():
+            key = (doc.get("client"), invoice_month(doc), doc.get("status"))
+            group = groups.setdefault(key, {
+                "_id": {"client": key[0], "month": key[1], "status": key[2]}, "count": 0, "amount": 0
+            })
+            group["count"] += 1
+            group["amount"] += doc.get("amount") or 0
+        return list(groups.values())
+
+    async def duplicate_numbers(self):
+        # The unique index check keeps these from arising here; kept so the
+        # backends answer alike
+        ids = {}
+        for doc in sorted(self.docs.values(), key=lambda doc: (doc.get("created_date"), doc["id"])):
+            ids.setdefault(doc.get("invoice_number"), []).append(doc["id"])
+        return [{"_id": number, "ids": group} for number, group in ids.items() if len(group) > 1]
+
+class InMemoryCounterStore(CounterStore):
+    def __init__(self):
+        self.docs = {}
+
+    async def get(self, key):
+        doc = self.docs.get(key)
+        return dict(doc) if doc is not None else None
+
+    async def increment(self, key, deltas, timestamp_field=None, return_after=False):
+        doc = self.docs.setdefault(key, {"_id": key})
+        for field, delta in deltas.items():
+            doc[field] = doc.get(field, 0) + delta
+        if timestamp_field:
+            doc[timestamp_field] = datetime.utcnow()
+        if return_after:
+            return dict(doc)
+
+    async def replace(self, key, values):
+        self.docs[key] = {"_id": key, **values}
+
+class InMemoryRollupStore(RollupStore):
+    def __init__(self):
+        self.buckets = {}
+
+    async def apply(self, increments):
+        for bucket_id, identity, inc in increments:
+            bucket = self.buckets.setdefault(bucket_id, {"_id": bucket_id, **identity})
+            for path, delta in inc.items():
+                *parents, leaf = path.split(".")
+                target = bucket
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[leaf] = target.get(leaf, 0) + delta
+
+    async def query(self, kind, client=None, month_from=None, month_to=None):
+        docs = [
+            bucket for bucket in self.buckets.values()
+            if bucket["kind"] == kind and bucket.get("count", 0) > 0
+            and (client is None or bucket.get("client") == client)
+            and (not month_from or (bucket.get("month") or "") >= month_from)
+            and (not month_to or (bucket.get("month") or "") <= month_to)
+        ]
+        docs.sort(key=lambda bucket: (bucket.get("client") or "", bucket.get("month") or ""))
+        return [
+            {field: value for field, value in bucket.items() if field not in ("_id", "kind")}
+            for bucket in docs
+        ]
+
+    async def replace_all(self, buckets):
+        self.buckets = {bucket["_id"]: dict(bucket) for bucket in buckets}
+
+def memory_storage():
+    return Storage(
+        clients=InMemoryClientRepository("clients"),
+        projects=InMemoryRepository("projects"),
+        invoices=InMemoryInvoiceRepository("invoices"),
+        stats=InMemoryCounterStore(),
+        counters=InMemoryCounterStore(),
+        rollups=InMemoryRollupStore(),
+    )
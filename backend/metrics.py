@@ -0,0 +1,107 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+# Per-route HTTP metrics rendered in the Prometheus text format. Requests are
+# labelled by route template (e.g. /api/invoices/{invoice_id}) so ids do not
+# explode the label space.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class RouteHistogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+def route_template(scope):
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status codes and in-flight requests.
+
+    The per-request work is two perf_counter calls, a bisect and a few dict
+    updates. In-flight requests are kept as their scopes and only grouped by
+    route at scrape time, since the route is not known until the router has
+    run.
+    """
+
+    def __init__(self, app, registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry = self.registry
+        key = id(scope)
+        registry.active[key] = scope
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            del registry.active[key]
+            registry.observe(scope["method"], route_template(scope), status_code, elapsed)
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = defaultdict(RouteHistogram)
+        self.responses = defaultdict(int)
+        self.active = {}
+
+    def observe(self, method, route, status_code, seconds):
+        self.histograms[(method, route)].observe(seconds)
+        self.responses[(method, route, status_code)] += 1
+
+    def render(self):
+        lines = [
+            "# HELP http_request_duration_seconds HTTP request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.histograms.items()):
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.total}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP http_requests_total HTTP responses by route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status_code), count in sorted(self.responses.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status_code}"}} {count}')
+
+        in_flight = defaultdict(int)
+        for scope in list(self.active.values()):
+            in_flight[(scope["method"], route_template(scope))] += 1
+        lines += [
+            "# HELP http_requests_in_flight HTTP requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for (method, route), count in sorted(in_flight.items()):
+            lines.append(f'http_requests_in_flight{{method="{method}",route="{route}"}} {count}')
+        return "\n".join(lines) + "\n"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import uuid
 
@@ -22,11 +22,6 @@ class ClientUpdate(BaseModel):
 class Client(ClientBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     join_date: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 # Project Models
 class ProjectBase(BaseModel):
@@ -53,11 +48,6 @@ class ProjectUpdate(BaseModel):
 class Project(ProjectBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     created_date: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 # Invoice Models
 class InvoiceBase(BaseModel):
@@ -93,13 +83,10 @@ class InvoiceUpdate(BaseModel):
 
 class Invoice(InvoiceBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    invoice_number: str = Field(default_factory=lambda: f"INV-{int(datetime.now().timestamp())}")
+    # Allocated by sequences.SequenceAllocator; there is deliberately no
+    # default, since anything else can collide
+    invoice_number: str
     created_date: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 # Dashboard Stats Model
 class DashboardStats(BaseModel):
@@ -107,4 +94,63 @@ class DashboardStats(BaseModel):
     active_projects: int
     total_revenue: float
     recent_clients: List[Client]
-    recent_projects: List[Project]
\ No newline at end of file
+    recent_projects: List[Project]
+
+# Bulk Create Models
+class BulkItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkCreateResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BulkItemResult]
+
+# Search Models
+class SearchResults(BaseModel):
+    query: str
+    page: int
+    clients: List[Client]
+    projects: List[Project]
+    invoices: List[Invoice]
+    has_more: Dict[str, bool]
+
+# Analytics Models
+class StatusTotals(BaseModel):
+    count: int
+    amount: float
+
+class InvoiceRollup(BaseModel):
+    month: Optional[str] = None
+    client: Optional[str] = None
+    count: int
+    amount: float
+    by_status: Dict[str, StatusTotals] = {}
+
+
+# Report Models
+class AgingBuckets(BaseModel):
+    current: float = 0
+    days_1_30: float = 0
+    days_31_60: float = 0
+    days_61_90: float = 0
+    days_over_90: float = 0
+    total: float = 0
+    count: int = 0
+
+class ClientAging(AgingBuckets):
+    client: Optional[str] = None
+
+class AgingReport(BaseModel):
+    as_of: str
+    totals: AgingBuckets
+    clients: List[ClientAging]
+
+class ClientSummary(BaseModel):
+    client: Client
+    projects: List[Project]
+    invoices: List[Invoice]
+    total_invoiced: float
+    outstanding_balance: float
@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+# List contract: the body stays a plain JSON array of at most `limit` rows;
+# when more rows exist, the cursor for the next page is returned in the
+# X-Next-Cursor header and passed back as ?cursor=. Callers that send no
+# limit get the 1000 rows the endpoints returned before pagination, so they
+# see no change until they start following the header.
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Dates are stored as naive UTC, as pymongo returns them; aware values from
+# query parameters or cursors are converted the way pymongo encodes them
+def naive_utc(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Cursors are opaque to clients: base64url of [sort field, direction, sort
+# value, id] taken from the last document of the previous page. Pages are
+# keyed on (sort_field, id) so ties on the sort value never skip or repeat a
+# document. direction is -1 for descending (the default) and 1 for ascending.
+def encode_cursor(doc, sort_field, direction=-1):
+    value = doc[sort_field]
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps([sort_field, direction, value, doc["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, sort_field, direction=-1):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_field, cursor_direction, value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(value, dict):
+            value = naive_utc(datetime.fromisoformat(value["$date"]))
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_field, cursor_direction) != (sort_field, direction):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    return value, str(doc_id)
+
+def keyset_filter(sort_field, cursor, direction=-1):
+    value, doc_id = decode_cursor(cursor, sort_field, direction)
+    op = "$lt" if direction < 0 else "$gt"
+    return {"$or": [
+        {sort_field: {op: value}},
+        {sort_field: value, "id": {op: doc_id}},
+    ]}
+
+def page_sort(sort_field, direction=-1):
+    return [(sort_field, direction), ("id", direction)]
+
+async def fetch_page(collection, sort_field, limit, cursor: Optional[str] = None, query=None,
+                     projection=None, direction=-1):
+    """Return one page of documents in (sort_field, id) order and the cursor for the next page."""
+    query = dict(query or {})
+    if cursor:
+        after = keyset_filter(sort_field, cursor, direction)
+        query = {"$and": [query, after]} if query else after
+
+    # Fetch one extra document to learn whether another page exists
+    docs = await collection.find(query, projection).sort(page_sort(sort_field, direction)).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field, direction)
+    return docs, next_cursor
+
+def set_next_cursor(response: Response, next_cursor):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
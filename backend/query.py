@@ -0,0 +1,157 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+
+from indexes import INDEXES, index_keys
+
+# Server-side filtering and sorting for the list and export endpoints.
+# Equality filters and the sort key must together match the prefix of one of
+# the (equality..., sort key, id) indexes declared in indexes.py, and range
+# filters are only allowed on the sort key, so every accepted query is an
+# index range scan with no in-memory sort. Anything else is rejected with a
+# 400 rather than silently turning into a collection scan.
+SORTABLE_FIELDS = {
+    "clients": ("join_date", "name"),
+    "projects": ("created_date", "budget"),
+    "invoices": ("created_date", "due_date", "amount"),
+}
+
+DEFAULT_SORT = {
+    "clients": "join_date",
+    "projects": "created_date",
+    "invoices": "created_date",
+}
+
+@dataclass(frozen=True)
+class ListQuery:
+    filter: dict = field(default_factory=dict)
+    sort_field: str = "created_date"
+    direction: int = -1
+
+def supported_shapes(collection_name):
+    """(equality fields, sort field) pairs an index serves, for error messages."""
+    shapes = []
+    for model in INDEXES[collection_name]:
+        keys = index_keys(model)
+        if len(keys) >= 2 and keys[-1] == "id":
+            shapes.append((tuple(keys[:-2]), keys[-2]))
+    return shapes
+
+def _index_serves(collection_name, equality_fields, sort_field):
+    return any(
+        set(equality) == set(equality_fields) and sort == sort_field
+        for equality, sort in supported_shapes(collection_name)
+    )
+
+def _parse_sort(collection_name, sort):
+    direction = -1 if sort.startswith("-") else 1
+    sort = sort.lstrip("+-")
+    if sort not in SORTABLE_FIELDS[collection_name]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by {sort}; sortable fields: {', '.join(SORTABLE_FIELDS[collection_name])}"
+        )
+    return sort, direction
+
+def build_list_query(collection_name, equality=None, ranges=None, sort: Optional[str] = None):
+    """Validate filters and sort against the declared indexes and build the Mongo query.
+
+    equality maps field -> value, ranges maps field -> (lower, upper) with
+    inclusive bounds; None values are ignored. sort is a field name, prefixed
+    with "-" for descending. Without an explicit sort, a range filter sorts by
+    its own field, otherwise the collection's default date order is used.
+    """
+    equality = {name: value for name, value in (equality or {}).items() if value is not None}
+    ranges = {
+        name: (lower, upper) for name, (lower, upper) in (ranges or {}).items()
+        if lower is not None or upper is not None
+    }
+
+    if len(ranges) > 1:
+        raise HTTPException(status_code=400, detail="Only one range filter can be used at a time")
+    if sort is None:
+        sort = f"-{next(iter(ranges))}" if ranges else f"-{DEFAULT_SORT[collection_name]}"
+    sort_field, direction = _parse_sort(collection_name, sort)
+
+    for name in ranges:
+        if name != sort_field:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A range filter on {name} requires sort={name} or sort=-{name}"
+            )
+
+    if not _index_serves(collection_name, equality, sort_field):
+        shapes = "; ".join(
+            f"{'+'.join(fields) or 'no filter'} sorted by {sort}"
+            for fields, sort in supported_shapes(collection_name)
+        )
+        raise HTTPException(
+            status_code=400,
+            detail=f"No index serves filters [{', '.join(sorted(equality))}] sorted by {sort_field}; "
+                   f"supported: {shapes}"
+        )
+
+    query = dict(equality)
+    for name, (lower, upper) in ranges.items():
+        bounds = {}
+        if lower is not None:
+            bounds["$gte"] = lower
+        if upper is not None:
+            bounds["$lte"] = upper
+        query[name] = bounds
+    return ListQuery(filter=query, sort_field=sort_field, direction=direction)
+
+# FastAPI dependencies declaring each list endpoint's filter parameters
+def client_list_query(
+    company: Optional[str] = None,
+    joined_from: Optional[datetime] = None,
+    joined_to: Optional[datetime] = None,
+    sort: Optional[str] = None
+):
+    return build_list_query(
+        "clients",
+        equality={"company": company},
+        ranges={"join_date": (joined_from, joined_to)},
+        sort=sort
+    )
+
+def project_list_query(
+    status: Optional[str] = None,
+    client: Optional[str] = None,
+    budget_min: Optional[float] = None,
+    budget_max: Optional[float] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: Optional[str] = None
+):
+    return build_list_query(
+        "projects",
+        equality={"status": status, "client": client},
+        ranges={"budget": (budget_min, budget_max), "created_date": (created_from, created_to)},
+        sort=sort
+    )
+
+def invoice_list_query(
+    status: Optional[str] = None,
+    client: Optional[str] = None,
+    project: Optional[str] = None,
+    due_date_from: Optional[str] = None,
+    due_date_to: Optional[str] = None,
+    amount_min: Optional[float] = None,
+    amount_max: Optional[float] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: Optional[str] = None
+):
+    return build_list_query(
+        "invoices",
+        equality={"status": status, "client": client, "project": project},
+        ranges={
+            "due_date": (due_date_from, due_date_to),
+            "amount": (amount_min, amount_max),
+            "created_date": (created_from, created_to),
+        },
+        sort=sort
+    )
@@ -0,0 +1,139 @@
+import math
+import os
+from datetime import datetime
+
+from pagination import naive_utc
+
+AGING_REPORT_TTL_SECONDS = float(os.environ.get("AGING_REPORT_TTL_SECONDS", "60"))
+
+# Receivables aging: unpaid invoices bucketed by whole days past due_date.
+# (upper bound in days, bucket name); anything beyond the last bound is 90+.
+AGING_BUCKETS = [
+    (0, "current"),
+    (30, "days_1_30"),
+    (60, "days_31_60"),
+    (90, "days_61_90"),
+]
+OVER_90 = "days_over_90"
+UNPAID_STATUSES = ["pending", "overdue"]
+
+def aging_pipeline(as_of: datetime):
+    """One aggregation computing per-client and overall aging buckets.
+
+    The status match is served by the status-prefixed invoice indexes.
+    due_date is stored as a string, so it is parsed server side; invoices
+    whose due_date cannot be parsed are counted as current.
+    """
+    days_past_due = {"$floor": {"$divide": [
+        {"$subtract": [as_of, {"$ifNull": ["$due", as_of]}]},
+        86400000
+    ]}}
+    bucket = {"$switch": {
+        "branches": [
+            {"case": {"$lte": ["$days_past_due", upper]}, "then": name}
+            for upper, name in AGING_BUCKETS
+        ],
+        "default": OVER_90,
+    }}
+    group_fields = {"amount": {"$sum": "$amount"}, "count": {"$sum": 1}}
+    return [
+        {"$match": {"status": {"$in": UNPAID_STATUSES}}},
+        {"$project": {
+            "client": 1,
+            "amount": 1,
+            "due": {"$dateFromString": {"dateString": "$due_date", "onError": None, "onNull": None}},
+        }},
+        {"$addFields": {"days_past_due": days_past_due}},
+        {"$addFields": {"bucket": bucket}},
+        {"$facet": {
+            "by_client": [{"$group": {"_id": {"client": "$client", "bucket": "$bucket"}, **group_fields}}],
+            "totals": [{"$group": {"_id": "$bucket", **group_fields}}],
+        }},
+    ]
+
+def _empty_buckets():
+    return {**{name: 0 for _, name in AGING_BUCKETS}, OVER_90: 0, "total": 0, "count": 0}
+
+def _add(target, bucket, amount, count):
+    target[bucket] += amount
+    target["total"] += amount
+    target["count"] += count
+
+def _parse_due(due_date):
+    # What $dateFromString makes of it: a UTC instant, or None if unparseable
+    try:
+        due = datetime.fromisoformat(str(due_date))
+    except ValueError:
+        return None
+    return naive_utc(due)
+
+def aging_bucket(due_date, as_of: datetime):
+    """The bucket aging_pipeline puts an invoice with this due_date in, for backends without pipelines."""
+    due = _parse_due(due_date) or as_of
+    days_past_due = math.floor((as_of - due).total_seconds() / 86400)
+    for upper, name in AGING_BUCKETS:
+        if days_past_due <= upper:
+            return name
+    return OVER_90
+
+async def build_aging_report(invoices, as_of: datetime):
+    facets = await invoices.aging_groups(as_of)
+
+    totals = _empty_buckets()
+    for group in facets["totals"]:
+        _add(totals, group["_id"], group["amount"], group["count"])
+
+    clients = {}
+    for group in facets["by_client"]:
+        client = group["_id"].get("client")
+        entry = clients.setdefault(client, {"client": client, **_empty_buckets()})
+        _add(entry, group["_id"]["bucket"], group["amount"], group["count"])
+
+    return {
+        "as_of": as_of.date().isoformat(),
+        "totals": totals,
+        "clients": sorted(clients.values(), key=lambda entry: -entry["total"]),
+    }
+
+# Client 360: a client with all their projects and invoices, newest first.
+# Projects and invoices reference the client by name only.
+NEWEST_FIRST = {"created_date": -1, "id": -1}
+
+def _unpaid_total(invoices_expression):
+    return {"$sum": {"$map": {
+        "input": {"$filter": {
+            "input": invoices_expression, "as": "invoice",
+            "cond": {"$in": ["$$invoice.status", UNPAID_STATUSES]},
+        }},
+        "as": "invoice",
+        "in": "$$invoice.amount",
+    }}}
+
+def client_summary_pipeline(client_id, projects_collection, invoices_collection):
+    """One aggregation returning the client, their projects and invoices, and totals.
+
+    The match uses the unique id index; each $lookup is an equality on
+    client followed by the created_date sort, which the (client,
+    created_date, id) indexes serve without an in-memory sort. The
+    localField form with a sub-pipeline needs MongoDB 5.0.
+    """
+    def lookup(collection, field):
+        return {"$lookup": {
+            "from": collection,
+            "localField": "client.name",
+            "foreignField": "client",
+            "pipeline": [{"$sort": NEWEST_FIRST}, {"$project": {"_id": 0}}],
+            "as": field,
+        }}
+
+    return [
+        {"$match": {"id": client_id}},
+        {"$project": {"_id": 0, "client": "$$ROOT"}},
+        {"$project": {"client._id": 0}},
+        lookup(projects_collection, "projects"),
+        lookup(invoices_collection, "invoices"),
+        {"$addFields": {
+            "total_invoiced": {"$sum": "$invoices.amount"},
+            "outstanding_balance": _unpaid_total("$invoices"),
+        }},
+    ]
@@ -0,0 +1,288 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from pagination import fetch_page, keyset_filter, page_sort
+from query import ListQuery
+from reports import aging_pipeline, client_summary_pipeline
+from rollups import REBUILD_PIPELINE
+from search import search_collection
+from sequences import DUPLICATE_NUMBERS_PIPELINE
+
+# Storage interfaces the handlers talk to, with the MongoDB (Motor)
+# implementations alongside. memory_store.py implements the same interfaces
+# in process for benchmarks and tests that should not need a database.
+#
+# Repository     clients, projects and invoices, addressed by their "id";
+#                ClientRepository and InvoiceRepository add the reports and
+#                rollups that MongoDB computes with aggregation pipelines
+# CounterStore   small documents of numeric counters keyed by name: the
+#                dashboard totals, collection change markers, sequences
+# RollupStore    the pre-aggregated invoice buckets of rollups.py
+#
+# Queries are plain MongoDB filter documents limited to what the API builds:
+# equality, $in and the range operators.
+
+class DuplicateDocument(Exception):
+    """An insert or update collided with a unique index."""
+
+class Repository(ABC):
+    """Documents of one entity type, addressed by their "id" field."""
+
+    def __init__(self, name):
+        self.name = name
+
+    @abstractmethod
+    async def get(self, doc_id, projection=None):
+        """The document with this id, or None."""
+
+    @abstractmethod
+    async def insert(self, doc):
+        """Insert one document; raises DuplicateDocument on a unique key collision."""
+
+    @abstractmethod
+    async def insert_many(self, docs):
+        """Unordered insert; returns {position in docs: error message} for the rejected ones."""
+
+    @abstractmethod
+    async def update(self, doc_id, changes, return_before=False):
+        """Set the fields in changes; returns the document after (or before) the update, None if missing."""
+
+    @abstractmethod
+    async def update_many(self, doc_ids, changes, only_if=None):
+        """Set changes on the given ids that still match only_if; returns how many were modified."""
+
+    @abstractmethod
+    async def delete(self, doc_id):
+        """Delete and return the document, or None if missing."""
+
+    @abstractmethod
+    async def page(self, list_query: ListQuery, limit, cursor=None, projection=None):
+        """One page in (sort field, id) order and the cursor for the next page."""
+
+    @abstractmethod
+    def scan(self, list_query: ListQuery, cursor=None, projection=None, batch_size=None):
+        """Async iterator over every match in (sort field, id) order, starting after cursor."""
+
+    @abstractmethod
+    async def count(self, query=None):
+        pass
+
+    @abstractmethod
+    async def total(self, field, query=None):
+        """Sum of field over the matching documents."""
+
+    @abstractmethod
+    async def search(self, q, page, limit):
+        """One page of text matches, best first, and whether more exist."""
+
+class ClientRepository(Repository):
+    @abstractmethod
+    async def summary(self, client_id, projects: Repository, invoices: Repository):
+        """The client with their projects and invoices, newest first, and invoice totals; None if missing.
+
+        Shaped as client_summary_pipeline returns it.
+        """
+
+class InvoiceRepository(Repository):
+    @abstractmethod
+    async def aging_groups(self, as_of):
+        """Unpaid amount and count per (client, aging bucket) and per bucket, as aging_pipeline's facets."""
+
+    @abstractmethod
+    async def rollup_groups(self):
+        """Count and amount per (client, created month, status), as REBUILD_PIPELINE returns them."""
+
+    @abstractmethod
+    async def duplicate_numbers(self):
+        """Invoice numbers held by more than one invoice, as DUPLICATE_NUMBERS_PIPELINE returns them."""
+
+class CounterStore(ABC):
+    @abstractmethod
+    async def get(self, key):
+        """The counter document, or None."""
+
+    @abstractmethod
+    async def increment(self, key, deltas, timestamp_field=None, return_after=False):
+        """Atomically add deltas, creating the document if needed.
+
+        timestamp_field, if given, is set to the current time. The updated
+        document is returned when return_after is set.
+        """
+
+    @abstractmethod
+    async def replace(self, key, values):
+        pass
+
+class RollupStore(ABC):
+    @abstractmethod
+    async def apply(self, increments):
+        """Apply (bucket id, identity fields, {dotted field: delta}) increments, creating buckets."""
+
+    @abstractmethod
+    async def query(self, kind, client=None, month_from=None, month_to=None):
+        """Non-empty buckets of a kind, ordered by client then month, without _id and kind."""
+
+    @abstractmethod
+    async def replace_all(self, buckets):
+        pass
+
+@dataclass
+class Storage:
+    clients: ClientRepository
+    projects: Repository
+    invoices: InvoiceRepository
+    stats: CounterStore
+    counters: CounterStore
+    rollups: RollupStore
+    # The Motor database when backed by MongoDB, for index builds and admin
+    database: Any = None
+
+class MotorRepository(Repository):
+    def __init__(self, collection, name=None):
+        super().__init__(name or collection.name)
+        self.collection = collection
+
+    async def get(self, doc_id, projection=None):
+        return await self.collection.find_one({"id": doc_id}, projection)
+
+    async def insert(self, doc):
+        try:
+            await self.collection.insert_one(doc)
+        except DuplicateKeyError as e:
+            raise DuplicateDocument(str(e))
+
+    async def insert_many(self, docs):
+        # With ordered=False the server attempts every document, and the
+        # writeErrors indices refer to positions in the docs list
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            return {err["index"]: err["errmsg"] for err in e.details.get("writeErrors", [])}
+        return {}
+
+    async def update(self, doc_id, changes, return_before=False):
+        try:
+            return await self.collection.find_one_and_update(
+                {"id": doc_id},
+                {"$set": changes},
+                return_document=ReturnDocument.BEFORE if return_before else ReturnDocument.AFTER
+            )
+        except DuplicateKeyError as e:
+            raise DuplicateDocument(str(e))
+
+    async def update_many(self, doc_ids, changes, only_if=None):
+        result = await self.collection.update_many(
+            {"id": {"$in": list(doc_ids)}, **(only_if or {})},
+            {"$set": changes}
+        )
+        return result.modified_count
+
+    async def delete(self, doc_id):
+        return await self.collection.find_one_and_delete({"id": doc_id})
+
+    async def page(self, list_query, limit, cursor=None, projection=None):
+        return await fetch_page(
+            self.collection, list_query.sort_field, limit, cursor,
+            query=list_query.filter, projection=projection, direction=list_query.direction
+        )
+
+    def scan(self, list_query, cursor=None, projection=None, batch_size=None):
+        query = list_query.filter
+        if cursor:
+            query = {"$and": [query, keyset_filter(list_query.sort_field, cursor, list_query.direction)]}
+        found = self.collection.find(query, projection).sort(page_sort(list_query.sort_field, list_query.direction))
+        return found.batch_size(batch_size) if batch_size else found
+
+    async def count(self, query=None):
+        return await self.collection.count_documents(query or {})
+
+    async def total(self, field, query=None):
+        pipeline = [{"$match": query}] if query else []
+        pipeline.append({"$group": {"_id": None, "total": {"$sum": f"${field}"}}})
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        return result[0]["total"] if result else 0
+
+    async def search(self, q, page, limit):
+        return await search_collection(self.collection, q, page, limit)
+
+class MotorClientRepository(MotorRepository, ClientRepository):
+    async def summary(self, client_id, projects, invoices):
+        pipeline = client_summary_pipeline(client_id, projects.name, invoices.name)
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        return result[0] if result else None
+
+class MotorInvoiceRepository(MotorRepository, InvoiceRepository):
+    async def aging_groups(self, as_of):
+        result = await self.collection.aggregate(aging_pipeline(as_of)).to_list(1)
+        return result[0] if result else {"by_client": [], "totals": []}
+
+    async def rollup_groups(self):
+        return await self.collection.aggregate(REBUILD_PIPELINE).to_list(None)
+
+    async def duplicate_numbers(self):
+        return await self.collection.aggregate(DUPLICATE_NUMBERS_PIPELINE).to_list(None)
+
+class MotorCounterStore(CounterStore):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, key):
+        return await self.collection.find_one({"_id": key})
+
+    async def increment(self, key, deltas, timestamp_field=None, return_after=False):
+        update = {"$inc": deltas}
+        if timestamp_field:
+            update["$currentDate"] = {timestamp_field: True}
+        if return_after:
+            return await self.collection.find_one_and_update(
+                {"_id": key}, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        await self.collection.update_one({"_id": key}, update, upsert=True)
+
+    async def replace(self, key, values):
+        await self.collection.replace_one({"_id": key}, values, upsert=True)
+
+class MotorRollupStore(RollupStore):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def apply(self, increments):
+        operations = [
+            UpdateOne({"_id": bucket_id}, {"$inc": inc, "$setOnInsert": identity}, upsert=True)
+            for bucket_id, identity, inc in increments
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def query(self, kind, client=None, month_from=None, month_to=None):
+        query = {"kind": kind, "count": {"$gt": 0}}
+        if client is not None:
+            query["client"] = client
+        if month_from or month_to:
+            query["month"] = {}
+            if month_from:
+                query["month"]["$gte"] = month_from
+            if month_to:
+                query["month"]["$lte"] = month_to
+        sort = [("client", 1), ("month", 1)] if kind != "month" else [("month", 1)]
+        return await self.collection.find(query, {"_id": 0, "kind": 0}).sort(sort).to_list(None)
+
+    async def replace_all(self, buckets):
+        await self.collection.delete_many({})
+        if buckets:
+            await self.collection.insert_many(buckets)
+
+def motor_storage(db):
+    return Storage(
+        clients=MotorClientRepository(db.clients),
+        projects=MotorRepository(db.projects),
+        invoices=MotorInvoiceRepository(db.invoices),
+        stats=MotorCounterStore(db.stats),
+        counters=MotorCounterStore(db.counters),
+        rollups=MotorRollupStore(db.invoice_rollups),
+        database=db,
+    )
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+# Invoice totals are kept pre-aggregated in the invoice_rollups collection,
+# one document per bucket:
+#   month:<YYYY-MM>                  all invoices created in that month
+#   client:<name>                    all invoices of a client
+#   client_month:<name>:<YYYY-MM>    a client's invoices in one month
+# Each holds count and amount overall and per status. The invoice write
+# handlers $inc the affected buckets, so analytics reads cost O(buckets)
+# rather than O(invoices); rebuild_rollups recomputes everything from the
+# invoices to correct drift.
+ROLLUP_KINDS = ("month", "client", "client_month")
+
+# Statuses are free-form strings used as field names under by_status, where
+# MongoDB reads "." as a path separator and rejects a leading "$"; they are
+# stored percent-escaped and unescaped again by query_rollups
+def _status_key(status):
+    return (status or "pending").replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def invoice_month(doc):
+    created = doc.get("created_date")
+    if isinstance(created, datetime):
+        return created.strftime("%Y-%m")
+    return str(created)[:7]
+
+def _bucket_keys(doc):
+    month = invoice_month(doc)
+    client = doc.get("client")
+    return [
+        (f"month:{month}", {"kind": "month", "month": month, "client": None}),
+        (f"client:{client}", {"kind": "client", "month": None, "client": client}),
+        (f"client_month:{client}:{month}", {"kind": "client_month", "month": month, "client": client}),
+    ]
+
+def _add_contribution(deltas, identities, doc, sign):
+    amount = doc.get("amount") or 0
+    status = _status_key(doc.get("status"))
+    for bucket_id, identity in _bucket_keys(doc):
+        identities[bucket_id] = identity
+        inc = deltas[bucket_id]
+        inc["count"] += sign
+        inc["amount"] += sign * amount
+        inc[f"by_status.{status}.count"] += sign
+        inc[f"by_status.{status}.amount"] += sign * amount
+
+async def apply_invoice_changes(rollup_store, changes):
+    """Apply the rollup deltas for (before, after) invoice pairs; None means absent."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    identities = {}
+    for before, after in changes:
+        if before:
+            _add_contribution(deltas, identities, before, -1)
+        if after:
+            _add_contribution(deltas, identities, after, 1)
+
+    increments = []
+    for bucket_id, inc in deltas.items():
+        inc = {field: value for field, value in inc.items() if value}
+        if inc:
+            increments.append((bucket_id, identities[bucket_id], inc))
+    if increments:
+        await rollup_store.apply(increments)
+
+REBUILD_PIPELINE = [
+    {"$group": {
+        "_id": {
+            "client": "$client",
+            "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_date"}},
+            "status": "$status",
+        },
+        "count": {"$sum": 1},
+        "amount": {"$sum": "$amount"},
+    }}
+]
+
+async def rebuild_rollups(rollup_store, invoices):
+    """Recompute every bucket from the invoices and replace the rollups."""
+    groups = await invoices.rollup_groups()
+
+    buckets = {}
+    for group in groups:
+        key = group["_id"]
+        doc = {"client": key["client"], "created_date": key["month"], "status": key["status"]}
+        for bucket_id, identity in _bucket_keys(doc):
+            bucket = buckets.setdefault(bucket_id, {"_id": bucket_id, **identity, "count": 0, "amount": 0, "by_status": {}})
+            status = bucket["by_status"].setdefault(_status_key(key["status"]), {"count": 0, "amount": 0})
+            for target in (bucket, status):
+                target["count"] += group["count"]
+                target["amount"] += group["amount"]
+
+    await rollup_store.replace_all(list(buckets.values()))
+    logger.info("Rebuilt %d invoice rollup buckets from %d groups", len(buckets), len(groups))
+    return {"buckets": len(buckets), "groups": len(groups)}
+
+async def query_rollups(rollup_store, kind, client=None, month_from=None, month_to=None):
+    docs = await rollup_store.query(kind, client=client, month_from=month_from, month_to=month_to)
+    # Statuses whose invoices all moved elsewhere are left at zero by $inc
+    for doc in docs:
+        doc["by_status"] = {
+            unquote(status): totals for status, totals in doc.get("by_status", {}).items() if totals["count"]
+        }
+    return docs
+
+if __name__ == "__main__":
+    # Full rebuild from the command line: python rollups.py
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from repository import MotorRepository, MotorRollupStore
+
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        print(await rebuild_rollups(MotorRollupStore(db.invoice_rollups), MotorRepository(db.invoices)))
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,19 @@
+# Full-text search over the weighted text indexes declared in indexes.py.
+# Each collection is ranked by its own textScore and paginated independently;
+# scores are not comparable across collections because the weights differ.
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# skip() still walks the skipped matches, so keep deep paging bounded
+MAX_SEARCH_PAGE = 50
+
+async def search_collection(collection, q, page, limit):
+    """Return one page of text matches, best first, and whether more exist."""
+    score = {"$meta": "textScore"}
+    docs = await (
+        collection.find({"$text": {"$search": q}}, {"_id": 0, "score": score})
+        .sort([("score", score)])
+        .skip((page - 1) * limit)
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    return docs[:limit], len(docs) > limit
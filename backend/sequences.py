@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+INVOICE_NUMBER_BLOCK_SIZE = int(os.environ.get("INVOICE_NUMBER_BLOCK_SIZE", "100"))
+
+# Ids of the invoices sharing each invoice number, oldest first. Before the
+# allocator, numbers were INV-<unix timestamp>, so invoices created in the
+# same second share one.
+DUPLICATE_NUMBERS_PIPELINE = [
+    {"$sort": {"created_date": 1, "id": 1}},
+    {"$group": {"_id": "$invoice_number", "ids": {"$push": "$id"}, "count": {"$sum": 1}}},
+    {"$match": {"count": {"$gt": 1}}},
+    {"$project": {"_id": 1, "ids": 1}},
+]
+
+class SequenceAllocator:
+    """Hands out numbers from a named counter in the counters store.
+
+    Each process leases a block of block_size numbers with one atomic $inc
+    and serves allocations from it in memory, so only one round trip in
+    block_size touches the database. Numbers are unique across processes but
+    not gap-free: whatever is left of a block when a worker stops is skipped.
+    """
+
+    def __init__(self, counters_store, name, block_size=INVOICE_NUMBER_BLOCK_SIZE, template="{}"):
+        self.counters_store = counters_store
+        self.name = name
+        self.block_size = block_size
+        self.template = template
+        self._next = 0
+        self._end = 0  # exclusive
+        self._lock = asyncio.Lock()
+
+    async def _lease(self, size):
+        counter = await self.counters_store.increment(self.name, {"seq": size}, return_after=True)
+        self._end = counter["seq"] + 1
+        self._next = self._end - size
+
+    async def take(self, count):
+        """Allocate count numbers in ascending order, formatted with the template."""
+        numbers = []
+        async with self._lock:
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    await self._lease(max(self.block_size, count - len(numbers)))
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+        return [self.template.format(number) for number in numbers]
+
+    async def next(self):
+        return (await self.take(1))[0]
+
+async def renumber_duplicates(invoices, allocator):
+    """Give fresh numbers to all but the oldest invoice of each duplicated number.
+
+    Runs before invoice_number_unique is built, which cannot build over
+    duplicates. Returns how many invoices were renumbered.
+    """
+    renumbered = 0
+    for group in await invoices.duplicate_numbers():
+        stale = group["ids"][1:]
+        for doc_id, number in zip(stale, await allocator.take(len(stale))):
+            await invoices.update(doc_id, {"invoice_number": number})
+            logger.warning("Renumbered invoice %s from %s to %s", doc_id, group["_id"], number)
+        renumbered += len(stale)
+    return renumbered
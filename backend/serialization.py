@@ -0,0 +1,27 @@
+from functools import lru_cache
+from typing import List
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# Helper function to convert MongoDB document to dict
+def serialize_doc(doc):
+    if doc and "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+# Fast path for list endpoints. Documents read from our own collections were
+# written from the same models, so they get a single validation pass through
+# a cached TypeAdapter and are encoded straight to JSON bytes by
+# pydantic-core. This skips the per-document Model(**doc) construction and
+# FastAPI's second validate-and-serialize pass against response_model.
+@lru_cache(maxsize=None)
+def list_adapter(model):
+    return TypeAdapter(List[model])
+
+def encode_list(model, docs):
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(docs))
+
+def list_response(model, docs):
+    return Response(content=encode_list(model, docs), media_type="application/json")
@@ -1,216 +1,605 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from pymongo.errors import PyMongoError
+import pymongo
+import asyncio
 import logging
+import os
+import time
+from datetime import date, datetime
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional
 from models import (
     Client, ClientCreate, ClientUpdate,
     Project, ProjectCreate, ProjectUpdate,
     Invoice, InvoiceCreate, InvoiceUpdate,
-    DashboardStats
+    DashboardStats, BulkCreateResult, SearchResults, InvoiceRollup, AgingReport, ClientSummary
+)
+from indexes import ensure_indexes, index_usage
+from stats import (
+    increment_counters, project_contribution, record_project_change, read_counters,
+    rebuild_counters, reconcile_periodically
+)
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, set_next_cursor
+from export import export_response
+from bulk import bulk_insert
+from cache import TTLCache
+from conditional import (
+    touch_collection, list_etag, doc_etag, is_not_modified, not_modified_response
 )
+from serialization import list_response, serialize_doc
+from query import ListQuery, client_list_query, project_list_query, invoice_list_query
+from search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, MAX_SEARCH_PAGE
+from sequences import SequenceAllocator, renumber_duplicates
+from sweeper import OverdueSweeper
+from reports import AGING_REPORT_TTL_SECONDS, build_aging_report
+from rollups import ROLLUP_KINDS, apply_invoice_changes, rebuild_rollups, query_rollups
+from fields import parse_fields, projection_for, trim_doc, trim_docs
+from dbmonitor import CommandMonitor
+from database import READY_PING_TIMEOUT_SECONDS, MongoSettings, PoolMonitor, connect, warm_pool
+from metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, MetricsRegistry
+from repository import Storage, motor_storage
+from memory_store import memory_storage
+from coalescer import INSERT_COALESCE_ENABLED, InsertCoalescer
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Create the main app without a prefix
-app = FastAPI()
+# "mongo", or "memory" to run the API on the in-process store with no database
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo")
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Collections
-clients_collection = db.clients
-projects_collection = db.projects
-invoices_collection = db.invoices
+class AppServices:
+    """One app's storage and the caches and workers built on it.
+
+    The lifespan builds it and keeps it on app.state.services; handlers get
+    it through the get_services dependency, so apps created side by side in
+    one process (one per test, say) share no state.
+    """
+
+    def __init__(self, storage: Storage, mongo_client=None):
+        self.storage = storage
+        self.client = mongo_client
+        # The Motor database, or None on backends without one
+        self.db = storage.database
+        # Read-through cache for single-entity GETs, keyed by (entity type, id)
+        self.entity_cache = TTLCache()
+        # Short-lived cache of computed aging reports, keyed by as-of date
+        self.aging_cache = TTLCache(maxsize=32, ttl=AGING_REPORT_TTL_SECONDS)
+        # Collision-free invoice numbers, leased from the counters store in blocks
+        self.invoice_numbers = SequenceAllocator(storage.counters, "invoice_number", template="INV-{:06d}")
+        # Periodically flips pending invoices past their due date to overdue
+        self.overdue_sweeper = OverdueSweeper(storage.invoices, on_updated=self.invoices_marked_overdue)
+        # Per-repository insert batching for creates, when INSERT_COALESCE_ENABLED
+        self.insert_coalescers = {}
+        if INSERT_COALESCE_ENABLED:
+            self.insert_coalescers = {
+                repository.name: InsertCoalescer(repository)
+                for repository in (storage.clients, storage.projects, storage.invoices)
+            }
+
+    # Side effects shared by every invoice write, given (before, after) pairs
+    # where None means the invoice did not exist on that side
+    async def record_invoice_changes(self, changes):
+        for before, after in changes:
+            self.entity_cache.invalidate(("invoice", (before or after)["id"]))
+        self.aging_cache.clear()
+        await touch_collection(self.storage.stats, "invoices")
+        await apply_invoice_changes(self.storage.rollups, changes)
+
+    # Invoices flipped to overdue by the background sweeper
+    async def invoices_marked_overdue(self, invoice_docs):
+        await self.record_invoice_changes([(doc, {**doc, "status": "overdue"}) for doc in invoice_docs])
+
+    # Look up one document by id, serving full documents from the entity cache.
+    # Sparse (?fields=) misses are fetched with a projection and not cached.
+    async def find_cached(self, entity, repository, doc_id, selected=None):
+        doc = self.entity_cache.get((entity, doc_id))
+        if doc is None:
+            if selected:
+                return await repository.get(doc_id, projection_for(selected))
+            doc = serialize_doc(await repository.get(doc_id))
+            if doc:
+                self.entity_cache.set((entity, doc_id), doc)
+        return doc
+
+    # Single-document create, batched with concurrent ones if coalescing is on
+    async def insert_document(self, repository, doc):
+        coalescer = self.insert_coalescers.get(repository.name)
+        if coalescer is None:
+            await repository.insert(doc)
+        else:
+            await coalescer.insert(doc)
+
+    async def assign_invoice_numbers(self, invoice_docs):
+        numbers = await self.invoice_numbers.take(len(invoice_docs))
+        for doc, number in zip(invoice_docs, numbers):
+            doc["invoice_number"] = number
+
+    async def close(self):
+        await asyncio.gather(*(coalescer.close() for coalescer in self.insert_coalescers.values()))
 
-# Helper function to convert MongoDB document to dict
-def serialize_doc(doc):
-    if doc and "_id" in doc:
-        doc["_id"] = str(doc["_id"])
-    return doc
+def get_services(request: Request) -> AppServices:
+    services = request.app.state.services
+    if services is None:
+        raise HTTPException(status_code=503, detail="Starting up")
+    return services
+
+# Carry headers set on the injected Response over to a response returned directly
+def with_headers(new_response, response: Response):
+    new_response.headers.update(response.headers)
+    return new_response
+
+# Non-null fields of an *Update model, as a $set document
+def extract_update_data(update_model):
+    update_data = {k: v for k, v in update_model.dict().items() if v is not None}
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No update data provided")
+    return update_data
+
+# PATCH responses carry only the fields whose value actually changed
+def changed_fields(doc_id, previous_doc, update_data):
+    changed = {k: v for k, v in update_data.items() if previous_doc.get(k) != v}
+    return {"id": doc_id, **changed}
+
+# Await a database call and record how long it took, in milliseconds
+async def timed(timings, name, awaitable):
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+# Per-sub-query latency breakdown, visible in browser dev tools
+def set_server_timing(response: Response, timings):
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={duration:.1f}" for name, duration in timings.items()
+    )
 
 # Dashboard endpoint
 @api_router.get("/dashboard", response_model=DashboardStats)
-async def get_dashboard_stats():
-    # Get total clients
-    total_clients = await clients_collection.count_documents({})
-    
-    # Get active projects
-    active_projects = await projects_collection.count_documents({"status": "active"})
-    
-    # Calculate total revenue (sum of all project budgets)
-    pipeline = [
-        {"$group": {"_id": None, "total": {"$sum": "$budget"}}}
-    ]
-    revenue_result = await projects_collection.aggregate(pipeline).to_list(1)
-    total_revenue = revenue_result[0]["total"] if revenue_result else 0
-    
-    # Get recent clients (last 5)
-    recent_clients_docs = await clients_collection.find().sort("join_date", -1).limit(5).to_list(5)
-    recent_clients = [Client(**serialize_doc(doc)) for doc in recent_clients_docs]
-    
-    # Get recent projects (last 5)
-    recent_projects_docs = await projects_collection.find().sort("created_date", -1).limit(5).to_list(5)
-    recent_projects = [Project(**serialize_doc(doc)) for doc in recent_projects_docs]
+async def get_dashboard_stats(response: Response, services: AppServices = Depends(get_services)):
+    # The three reads are independent, so issue them concurrently and pay
+    # one round trip instead of three
+    timings = {}
+    counters, (recent_clients_docs, _), (recent_projects_docs, _) = await asyncio.gather(
+        timed(timings, "counters", read_counters(services.storage.stats)),
+        timed(timings, "recent_clients", services.storage.clients.page(ListQuery(sort_field="join_date"), 5)),
+        timed(timings, "recent_projects", services.storage.projects.page(ListQuery(sort_field="created_date"), 5)),
+    )
+    # Counters are maintained by the write handlers; rebuild them if missing
+    if counters is None:
+        counters = await timed(timings, "counters_rebuild", rebuild_counters(
+            services.storage.stats, services.storage.clients, services.storage.projects
+        ))
+    set_server_timing(response, timings)
     
     return DashboardStats(
-        total_clients=total_clients,
-        active_projects=active_projects,
-        total_revenue=total_revenue,
-        recent_clients=recent_clients,
-        recent_projects=recent_projects
+        total_clients=counters["total_clients"],
+        active_projects=counters["active_projects"],
+        total_revenue=counters["total_revenue"],
+        recent_clients=[Client(**serialize_doc(doc)) for doc in recent_clients_docs],
+        recent_projects=[Project(**serialize_doc(doc)) for doc in recent_projects_docs]
     )
 
 # Client endpoints
 @api_router.get("/clients", response_model=List[Client])
-async def get_clients():
-    clients_docs = await clients_collection.find().sort("join_date", -1).to_list(1000)
-    return [Client(**serialize_doc(doc)) for doc in clients_docs]
+async def get_clients(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    list_query: ListQuery = Depends(client_list_query),
+    services: AppServices = Depends(get_services)
+):
+    selected = parse_fields(Client, fields)
+    etag = await list_etag(services.storage.stats, "clients", request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+
+    clients_docs, next_cursor = await services.storage.clients.page(
+        list_query, limit, cursor, projection=projection_for(selected, list_query.sort_field)
+    )
+    set_next_cursor(response, next_cursor)
+    if selected:
+        return with_headers(JSONResponse(trim_docs(Client, selected, clients_docs)), response)
+    return with_headers(list_response(Client, clients_docs), response)
+
+@api_router.get("/clients/export")
+async def export_clients(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    cursor: Optional[str] = None,
+    list_query: ListQuery = Depends(client_list_query),
+    services: AppServices = Depends(get_services)
+):
+    return export_response(services.storage.clients, Client, list_query, format, "clients", cursor=cursor)
 
 @api_router.post("/clients", response_model=Client)
-async def create_client(client: ClientCreate):
+async def create_client(client: ClientCreate, services: AppServices = Depends(get_services)):
     client_obj = Client(**client.dict())
-    await clients_collection.insert_one(client_obj.dict())
+    await services.insert_document(services.storage.clients, client_obj.dict())
+    await touch_collection(services.storage.stats, "clients")
+    await increment_counters(services.storage.stats, total_clients=1)
     return client_obj
 
+@api_router.post("/clients/bulk", response_model=BulkCreateResult)
+async def create_clients_bulk(clients: List[dict], services: AppServices = Depends(get_services)):
+    report, inserted_docs = await bulk_insert(services.storage.clients, ClientCreate, Client, clients)
+    if report.inserted:
+        await touch_collection(services.storage.stats, "clients")
+    await increment_counters(services.storage.stats, total_clients=len(inserted_docs))
+    return report
+
 @api_router.get("/clients/{client_id}", response_model=Client)
-async def get_client(client_id: str):
-    client_doc = await clients_collection.find_one({"id": client_id})
+async def get_client(client_id: str, request: Request, response: Response, fields: Optional[str] = None, services: AppServices = Depends(get_services)):
+    selected = parse_fields(Client, fields)
+    client_doc = await services.find_cached("client", services.storage.clients, client_id, selected)
     if not client_doc:
         raise HTTPException(status_code=404, detail="Client not found")
-    return Client(**serialize_doc(client_doc))
+    etag = doc_etag(client_doc, selected)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    if selected:
+        return with_headers(JSONResponse(trim_doc(Client, selected, client_doc)), response)
+    return Client(**client_doc)
+
+# The client page in one round trip: the client, their projects and invoices
+# and the outstanding balance, joined server side
+@api_router.get("/clients/{client_id}/summary", response_model=ClientSummary)
+async def get_client_summary(client_id: str, services: AppServices = Depends(get_services)):
+    storage = services.storage
+    summary = await storage.clients.summary(client_id, storage.projects, storage.invoices)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return summary
 
 @api_router.put("/clients/{client_id}", response_model=Client)
-async def update_client(client_id: str, client_update: ClientUpdate):
-    update_data = {k: v for k, v in client_update.dict().items() if v is not None}
-    if not update_data:
-        raise HTTPException(status_code=400, detail="No update data provided")
-    
-    result = await clients_collection.update_one(
-        {"id": client_id},
-        {"$set": update_data}
-    )
-    if result.matched_count == 0:
+async def update_client(client_id: str, client_update: ClientUpdate, services: AppServices = Depends(get_services)):
+    update_data = extract_update_data(client_update)
+    client_doc = await services.storage.clients.update(client_id, update_data)
+    if not client_doc:
         raise HTTPException(status_code=404, detail="Client not found")
-    
-    client_doc = await clients_collection.find_one({"id": client_id})
+    services.entity_cache.invalidate(("client", client_id))
+    await touch_collection(services.storage.stats, "clients")
     return Client(**serialize_doc(client_doc))
 
+@api_router.patch("/clients/{client_id}")
+async def patch_client(client_id: str, client_update: ClientUpdate, services: AppServices = Depends(get_services)):
+    update_data = extract_update_data(client_update)
+    previous_doc = await services.storage.clients.update(client_id, update_data, return_before=True)
+    if not previous_doc:
+        raise HTTPException(status_code=404, detail="Client not found")
+    services.entity_cache.invalidate(("client", client_id))
+    await touch_collection(services.storage.stats, "clients")
+    return changed_fields(client_id, previous_doc, update_data)
+
 @api_router.delete("/clients/{client_id}")
-async def delete_client(client_id: str):
-    result = await clients_collection.delete_one({"id": client_id})
-    if result.deleted_count == 0:
+async def delete_client(client_id: str, services: AppServices = Depends(get_services)):
+    if not await services.storage.clients.delete(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
+    services.entity_cache.invalidate(("client", client_id))
+    await touch_collection(services.storage.stats, "clients")
+    await increment_counters(services.storage.stats, total_clients=-1)
     return {"message": "Client deleted successfully"}
 
 # Project endpoints
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects():
-    projects_docs = await projects_collection.find().sort("created_date", -1).to_list(1000)
-    return [Project(**serialize_doc(doc)) for doc in projects_docs]
+async def get_projects(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    list_query: ListQuery = Depends(project_list_query),
+    services: AppServices = Depends(get_services)
+):
+    selected = parse_fields(Project, fields)
+    etag = await list_etag(services.storage.stats, "projects", request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+
+    projects_docs, next_cursor = await services.storage.projects.page(
+        list_query, limit, cursor, projection=projection_for(selected, list_query.sort_field)
+    )
+    set_next_cursor(response, next_cursor)
+    if selected:
+        return with_headers(JSONResponse(trim_docs(Project, selected, projects_docs)), response)
+    return with_headers(list_response(Project, projects_docs), response)
+
+@api_router.get("/projects/export")
+async def export_projects(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    cursor: Optional[str] = None,
+    list_query: ListQuery = Depends(project_list_query),
+    services: AppServices = Depends(get_services)
+):
+    return export_response(services.storage.projects, Project, list_query, format, "projects", cursor=cursor)
 
 @api_router.post("/projects", response_model=Project)
-async def create_project(project: ProjectCreate):
+async def create_project(project: ProjectCreate, services: AppServices = Depends(get_services)):
     project_obj = Project(**project.dict())
-    await projects_collection.insert_one(project_obj.dict())
+    await services.insert_document(services.storage.projects, project_obj.dict())
+    await touch_collection(services.storage.stats, "projects")
+    await record_project_change(services.storage.stats, None, project_obj.dict())
     return project_obj
 
+@api_router.post("/projects/bulk", response_model=BulkCreateResult)
+async def create_projects_bulk(projects: List[dict], services: AppServices = Depends(get_services)):
+    report, inserted_docs = await bulk_insert(services.storage.projects, ProjectCreate, Project, projects)
+    if report.inserted:
+        await touch_collection(services.storage.stats, "projects")
+    await increment_counters(
+        services.storage.stats,
+        active_projects=sum(project_contribution(doc)["active_projects"] for doc in inserted_docs),
+        total_revenue=sum(project_contribution(doc)["total_revenue"] for doc in inserted_docs)
+    )
+    return report
+
 @api_router.get("/projects/{project_id}", response_model=Project)
-async def get_project(project_id: str):
-    project_doc = await projects_collection.find_one({"id": project_id})
+async def get_project(project_id: str, request: Request, response: Response, fields: Optional[str] = None, services: AppServices = Depends(get_services)):
+    selected = parse_fields(Project, fields)
+    project_doc = await services.find_cached("project", services.storage.projects, project_id, selected)
     if not project_doc:
         raise HTTPException(status_code=404, detail="Project not found")
-    return Project(**serialize_doc(project_doc))
+    etag = doc_etag(project_doc, selected)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    if selected:
+        return with_headers(JSONResponse(trim_doc(Project, selected, project_doc)), response)
+    return Project(**project_doc)
 
-@api_router.put("/projects/{project_id}", response_model=Project)
-async def update_project(project_id: str, project_update: ProjectUpdate):
-    update_data = {k: v for k, v in project_update.dict().items() if v is not None}
-    if not update_data:
-        raise HTTPException(status_code=400, detail="No update data provided")
-    
-    result = await projects_collection.update_one(
-        {"id": project_id},
-        {"$set": update_data}
-    )
-    if result.matched_count == 0:
+async def apply_project_update(services, project_id, update_data):
+    # Projects are updated returning the previous version, which the dashboard
+    # counters need; the new version is that plus the $set fields
+    previous_doc = await services.storage.projects.update(project_id, update_data, return_before=True)
+    if not previous_doc:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    project_doc = await projects_collection.find_one({"id": project_id})
+    services.entity_cache.invalidate(("project", project_id))
+    await touch_collection(services.storage.stats, "projects")
+    project_doc = {**previous_doc, **update_data}
+    await record_project_change(services.storage.stats, previous_doc, project_doc)
+    return previous_doc, project_doc
+
+@api_router.put("/projects/{project_id}", response_model=Project)
+async def update_project(project_id: str, project_update: ProjectUpdate, services: AppServices = Depends(get_services)):
+    _, project_doc = await apply_project_update(services, project_id, extract_update_data(project_update))
     return Project(**serialize_doc(project_doc))
 
+@api_router.patch("/projects/{project_id}")
+async def patch_project(project_id: str, project_update: ProjectUpdate, services: AppServices = Depends(get_services)):
+    update_data = extract_update_data(project_update)
+    previous_doc, _ = await apply_project_update(services, project_id, update_data)
+    return changed_fields(project_id, previous_doc, update_data)
+
 @api_router.delete("/projects/{project_id}")
-async def delete_project(project_id: str):
-    result = await projects_collection.delete_one({"id": project_id})
-    if result.deleted_count == 0:
+async def delete_project(project_id: str, services: AppServices = Depends(get_services)):
+    project_doc = await services.storage.projects.delete(project_id)
+    if not project_doc:
         raise HTTPException(status_code=404, detail="Project not found")
+    services.entity_cache.invalidate(("project", project_id))
+    await touch_collection(services.storage.stats, "projects")
+    await record_project_change(services.storage.stats, project_doc, None)
     return {"message": "Project deleted successfully"}
 
 # Invoice endpoints
 @api_router.get("/invoices", response_model=List[Invoice])
-async def get_invoices():
-    invoices_docs = await invoices_collection.find().sort("created_date", -1).to_list(1000)
-    return [Invoice(**serialize_doc(doc)) for doc in invoices_docs]
+async def get_invoices(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    list_query: ListQuery = Depends(invoice_list_query),
+    services: AppServices = Depends(get_services)
+):
+    selected = parse_fields(Invoice, fields)
+    etag = await list_etag(services.storage.stats, "invoices", request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+
+    invoices_docs, next_cursor = await services.storage.invoices.page(
+        list_query, limit, cursor, projection=projection_for(selected, list_query.sort_field)
+    )
+    set_next_cursor(response, next_cursor)
+    if selected:
+        return with_headers(JSONResponse(trim_docs(Invoice, selected, invoices_docs)), response)
+    return with_headers(list_response(Invoice, invoices_docs), response)
+
+@api_router.get("/invoices/export")
+async def export_invoices(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    cursor: Optional[str] = None,
+    list_query: ListQuery = Depends(invoice_list_query),
+    services: AppServices = Depends(get_services)
+):
+    return export_response(services.storage.invoices, Invoice, list_query, format, "invoices", cursor=cursor)
 
 @api_router.post("/invoices", response_model=Invoice)
-async def create_invoice(invoice: InvoiceCreate):
-    invoice_obj = Invoice(**invoice.dict())
-    await invoices_collection.insert_one(invoice_obj.dict())
+async def create_invoice(invoice: InvoiceCreate, services: AppServices = Depends(get_services)):
+    invoice_obj = Invoice(**invoice.dict(), invoice_number=await services.invoice_numbers.next())
+    await services.insert_document(services.storage.invoices, invoice_obj.dict())
+    await services.record_invoice_changes([(None, invoice_obj.dict())])
     return invoice_obj
 
+@api_router.post("/invoices/bulk", response_model=BulkCreateResult)
+async def create_invoices_bulk(invoices: List[dict], services: AppServices = Depends(get_services)):
+    report, inserted_docs = await bulk_insert(
+        services.storage.invoices, InvoiceCreate, Invoice, invoices,
+        before_insert=services.assign_invoice_numbers
+    )
+    if inserted_docs:
+        await services.record_invoice_changes([(None, doc) for doc in inserted_docs])
+    return report
+
 @api_router.get("/invoices/{invoice_id}", response_model=Invoice)
-async def get_invoice(invoice_id: str):
-    invoice_doc = await invoices_collection.find_one({"id": invoice_id})
+async def get_invoice(invoice_id: str, request: Request, response: Response, fields: Optional[str] = None, services: AppServices = Depends(get_services)):
+    selected = parse_fields(Invoice, fields)
+    invoice_doc = await services.find_cached("invoice", services.storage.invoices, invoice_id, selected)
     if not invoice_doc:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    return Invoice(**serialize_doc(invoice_doc))
+    etag = doc_etag(invoice_doc, selected)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    if selected:
+        return with_headers(JSONResponse(trim_doc(Invoice, selected, invoice_doc)), response)
+    return Invoice(**invoice_doc)
 
-@api_router.put("/invoices/{invoice_id}", response_model=Invoice)
-async def update_invoice(invoice_id: str, invoice_update: InvoiceUpdate):
-    update_data = {k: v for k, v in invoice_update.dict().items() if v is not None}
-    if not update_data:
-        raise HTTPException(status_code=400, detail="No update data provided")
-    
-    result = await invoices_collection.update_one(
-        {"id": invoice_id},
-        {"$set": update_data}
-    )
-    if result.matched_count == 0:
+async def apply_invoice_update(services, invoice_id, update_data):
+    # Like projects, invoices are updated returning the previous version,
+    # which the rollups need; the new version is that plus the $set fields
+    previous_doc = await services.storage.invoices.update(invoice_id, update_data, return_before=True)
+    if not previous_doc:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
-    invoice_doc = await invoices_collection.find_one({"id": invoice_id})
+    invoice_doc = {**previous_doc, **update_data}
+    await services.record_invoice_changes([(previous_doc, invoice_doc)])
+    return previous_doc, invoice_doc
+
+@api_router.put("/invoices/{invoice_id}", response_model=Invoice)
+async def update_invoice(invoice_id: str, invoice_update: InvoiceUpdate, services: AppServices = Depends(get_services)):
+    _, invoice_doc = await apply_invoice_update(services, invoice_id, extract_update_data(invoice_update))
     return Invoice(**serialize_doc(invoice_doc))
 
+@api_router.patch("/invoices/{invoice_id}")
+async def patch_invoice(invoice_id: str, invoice_update: InvoiceUpdate, services: AppServices = Depends(get_services)):
+    update_data = extract_update_data(invoice_update)
+    previous_doc, _ = await apply_invoice_update(services, invoice_id, update_data)
+    return changed_fields(invoice_id, previous_doc, update_data)
+
 @api_router.delete("/invoices/{invoice_id}")
-async def delete_invoice(invoice_id: str):
-    result = await invoices_collection.delete_one({"id": invoice_id})
-    if result.deleted_count == 0:
+async def delete_invoice(invoice_id: str, services: AppServices = Depends(get_services)):
+    invoice_doc = await services.storage.invoices.delete(invoice_id)
+    if not invoice_doc:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    await services.record_invoice_changes([(invoice_doc, None)])
     return {"message": "Invoice deleted successfully"}
 
+# Search endpoint
+@api_router.get("/search", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=1),
+    page: int = Query(1, ge=1, le=MAX_SEARCH_PAGE),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    services: AppServices = Depends(get_services)
+):
+    (clients_docs, more_clients), (projects_docs, more_projects), (invoices_docs, more_invoices) = \
+        await asyncio.gather(
+            services.storage.clients.search(q, page, limit),
+            services.storage.projects.search(q, page, limit),
+            services.storage.invoices.search(q, page, limit),
+        )
+    return SearchResults(
+        query=q,
+        page=page,
+        clients=[Client(**doc) for doc in clients_docs],
+        projects=[Project(**doc) for doc in projects_docs],
+        invoices=[Invoice(**doc) for doc in invoices_docs],
+        has_more={"clients": more_clients, "projects": more_projects, "invoices": more_invoices}
+    )
+
+# Analytics endpoints
+@api_router.get("/analytics/invoices", response_model=List[InvoiceRollup])
+async def get_invoice_rollups(
+    group: Literal[ROLLUP_KINDS] = "month",
+    client: Optional[str] = None,
+    month_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    month_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    services: AppServices = Depends(get_services)
+):
+    return await query_rollups(services.storage.rollups, group, client, month_from, month_to)
+
+# Report endpoints
+@api_router.get("/reports/aging", response_model=AgingReport)
+async def get_aging_report(as_of: Optional[date] = None, services: AppServices = Depends(get_services)):
+    as_of = as_of or datetime.utcnow().date()
+    report = services.aging_cache.get(as_of)
+    if report is None:
+        report = await build_aging_report(services.storage.invoices, datetime.combine(as_of, datetime.min.time()))
+        services.aging_cache.set(as_of, report)
+    return report
+
+# Admin endpoints
+# MongoDB-only admin views are 501 on other storage backends
+def require_database(services: AppServices = Depends(get_services)):
+    if services.db is None:
+        raise HTTPException(status_code=501, detail="Not available without a MongoDB storage backend")
+    return services.db
+
+@api_router.get("/admin/indexes")
+async def get_index_usage(db=Depends(require_database)):
+    return await index_usage(db)
+
+@api_router.get("/admin/db", dependencies=[Depends(require_database)])
+async def get_db_command_stats(request: Request):
+    return request.app.state.db_monitor.report()
+
+@api_router.get("/admin/cache")
+async def get_cache_stats(services: AppServices = Depends(get_services)):
+    return services.entity_cache.stats()
+
+@api_router.get("/admin/sweeper")
+async def get_sweeper_metrics(services: AppServices = Depends(get_services)):
+    return services.overdue_sweeper.metrics()
+
+@api_router.get("/admin/coalescer")
+async def get_insert_coalescer_metrics(services: AppServices = Depends(get_services)):
+    return {
+        "enabled": bool(services.insert_coalescers),
+        "collections": {name: coalescer.metrics() for name, coalescer in services.insert_coalescers.items()},
+    }
+
+@api_router.post("/admin/sweeper/run")
+async def run_overdue_sweep(services: AppServices = Depends(get_services)):
+    return await services.overdue_sweeper.run_once()
+
+@api_router.post("/admin/rollups/rebuild")
+async def rebuild_invoice_rollups(services: AppServices = Depends(get_services)):
+    return await rebuild_rollups(services.storage.rollups, services.storage.invoices)
+
+@api_router.post("/admin/dashboard/reconcile")
+async def reconcile_dashboard_counters(services: AppServices = Depends(get_services)):
+    return await rebuild_counters(services.storage.stats, services.storage.clients, services.storage.projects)
+
+# Readiness: the database answers a ping (if there is one) and the pool
+# checkout queue is reported, so a load balancer can see requests piling up
+@api_router.get("/health/ready")
+async def readiness(request: Request):
+    services = request.app.state.services
+    if services is None:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    if services.db is None:
+        return {"status": "ready"}
+    pool_monitor = request.app.state.pool_monitor
+    try:
+        with pymongo.timeout(READY_PING_TIMEOUT_SECONDS):
+            await services.db.command("ping")
+    except PyMongoError as e:
+        return JSONResponse(status_code=503, content={
+            "status": "unavailable", "error": str(e), "pool": pool_monitor.report()
+        })
+    return {"status": "ready", "pool": pool_monitor.report()}
+
 # Root endpoint
 @api_router.get("/")
 async def root():
     return {"message": "Freelancer PM API is running"}
 
-# Include the router in the main app
-app.include_router(api_router)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Prometheus metrics, outside /api so scrapers need no prefix
+async def metrics(request: Request):
+    return PlainTextResponse(request.app.state.http_metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 # Configure logging
 logging.basicConfig(
@@ -219,6 +608,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if app.state.storage is not None:
+        services = AppServices(app.state.storage)
+    else:
+        settings = app.state.mongo_settings or MongoSettings.from_env()
+        mongo_client = connect(settings, event_listeners=[app.state.db_monitor, app.state.pool_monitor])
+        database = mongo_client[settings.db_name]
+        services = AppServices(motor_storage(database), mongo_client)
+        app.state.db_monitor.attach(asyncio.get_running_loop(), database)
+        await warm_pool(database, settings.min_pool_size)
+        logger.info("MongoDB pool warmed: %s", app.state.pool_monitor.report())
+        await ensure_indexes(database, before_create={
+            ("invoices", "invoice_number_unique"):
+                lambda: renumber_duplicates(services.storage.invoices, services.invoice_numbers),
+        })
+    app.state.services = services
+
+    storage = services.storage
+    background_tasks = [
+        asyncio.create_task(reconcile_periodically(storage.stats, storage.clients, storage.projects)),
+        asyncio.create_task(services.overdue_sweeper.run_periodically()),
+    ]
+    try:
+        yield
+    finally:
+        app.state.services = None
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await services.close()
+        if services.client is not None:
+            services.client.close()
+
+def create_app(settings: Optional[MongoSettings] = None, storage: Optional[Storage] = None) -> FastAPI:
+    """Build the app; the MongoDB client is opened by its lifespan, not here.
+
+    Passing storage (or STORAGE_BACKEND=memory) runs on that backend instead
+    and no MongoDB settings are needed. Without settings they are read from
+    the environment when the lifespan starts. Each app keeps its own storage,
+    caches and monitors, so several can run in one process.
+    """
+    if storage is None and STORAGE_BACKEND == "memory":
+        storage = memory_storage()
+    app = FastAPI(lifespan=lifespan)
+    app.state.storage = storage
+    app.state.mongo_settings = settings
+    # Built by the lifespan; None until startup and after shutdown
+    app.state.services = None
+    # Every MongoDB command is timed by db_monitor; the pool's checkout
+    # queue is tracked by pool_monitor
+    app.state.db_monitor = CommandMonitor()
+    app.state.pool_monitor = PoolMonitor()
+    app.state.http_metrics = MetricsRegistry()
+
+    app.include_router(api_router)
+    app.add_api_route("/metrics", metrics, include_in_schema=False)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing", "ETag"],
+    )
+
+    # Added last so it is outermost and times the whole middleware stack
+    app.add_middleware(MetricsMiddleware, registry=app.state.http_metrics)
+    return app
+
+app = create_app()
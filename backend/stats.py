@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# The dashboard counters live in a single document that the client and
+# project write handlers keep up to date with $inc, so the dashboard reads
+# them in O(1) instead of counting and summing the collections every time.
+DASHBOARD_STATS_ID = "dashboard"
+COUNTER_FIELDS = ("total_clients", "active_projects", "total_revenue")
+
+RECONCILE_INTERVAL_SECONDS = float(os.environ.get("DASHBOARD_RECONCILE_SECONDS", "3600"))
+
+def project_contribution(doc):
+    """What a single project document adds to the dashboard counters."""
+    if not doc:
+        return {"active_projects": 0, "total_revenue": 0}
+    return {
+        "active_projects": 1 if doc.get("status") == "active" else 0,
+        "total_revenue": doc.get("budget") or 0,
+    }
+
+async def increment_counters(stats_store, **deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    await stats_store.increment(DASHBOARD_STATS_ID, deltas)
+
+async def record_project_change(stats_store, before, after):
+    """Apply the counter delta between two versions of a project (None = absent)."""
+    old = project_contribution(before)
+    new = project_contribution(after)
+    await increment_counters(stats_store, **{field: new[field] - old[field] for field in new})
+
+async def read_counters(stats_store):
+    doc = await stats_store.get(DASHBOARD_STATS_ID)
+    if not doc:
+        return None
+    return {field: doc.get(field, 0) for field in COUNTER_FIELDS}
+
+async def rebuild_counters(stats_store, clients, projects):
+    """Recompute the counters from the clients and projects and overwrite the stats document."""
+    counters = {
+        "total_clients": await clients.count(),
+        "active_projects": await projects.count({"status": "active"}),
+        "total_revenue": await projects.total("budget"),
+    }
+    await stats_store.replace(DASHBOARD_STATS_ID, counters)
+    return counters
+
+async def reconcile_periodically(stats_store, clients, projects, interval=RECONCILE_INTERVAL_SECONDS):
+    """Background job correcting any drift between the counters and the data."""
+    while True:
+        try:
+            counters = await rebuild_counters(stats_store, clients, projects)
+            logger.info("Reconciled dashboard counters: %s", counters)
+        except Exception:
+            logger.exception("Dashboard counter reconcile failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+from query import ListQuery
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_SWEEP_INTERVAL_SECONDS = float(os.environ.get("OVERDUE_SWEEP_INTERVAL_SECONDS", "300"))
+OVERDUE_SWEEP_BATCH_SIZE = int(os.environ.get("OVERDUE_SWEEP_BATCH_SIZE", "500"))
+
+class OverdueSweeper:
+    """Periodically moves pending invoices past their due_date to overdue.
+
+    Candidates are read in batches from the (status, due_date, id) index and
+    flipped with one update_many per batch. The update repeats the status
+    condition so an invoice paid in the meantime is left alone, and stamps
+    swept_by with an id unique to the run. on_updated is awaited with the
+    pending versions of the invoices this run actually flipped, so callers
+    can invalidate caches and adjust derived totals. When the update changed
+    fewer invoices than were read, another write got to some first (a PUT,
+    or the sweeper of another worker process); the batch is then re-read and
+    only the invoices carrying this run's swept_by are passed on.
+    """
+
+    PROJECTION = {"_id": 0, "id": 1, "client": 1, "amount": 1, "status": 1, "due_date": 1, "created_date": 1}
+
+    def __init__(self, invoices, on_updated=None,
+                 interval=OVERDUE_SWEEP_INTERVAL_SECONDS, batch_size=OVERDUE_SWEEP_BATCH_SIZE):
+        self.invoices = invoices
+        self.on_updated = on_updated
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.total_updated = 0
+        self.last_run = None
+
+    async def run_once(self, today=None):
+        today = today or datetime.utcnow().date().isoformat()
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        run_id = uuid.uuid4().hex
+        run = {"started_at": started_at, "due_before": today, "batches": 0, "matched": 0, "updated": 0, "error": None}
+        try:
+            while True:
+                # Flipped invoices drop out of the query, so every batch is a first page
+                batch, _ = await self.invoices.page(
+                    ListQuery({"status": "pending", "due_date": {"$lt": today}}, "due_date", 1),
+                    self.batch_size,
+                    projection=self.PROJECTION
+                )
+                if not batch:
+                    break
+                ids = [doc["id"] for doc in batch]
+                modified = await self.invoices.update_many(
+                    ids, {"status": "overdue", "swept_by": run_id}, only_if={"status": "pending"}
+                )
+                run["batches"] += 1
+                run["matched"] += len(ids)
+                run["updated"] += modified
+                if self.on_updated and modified:
+                    flipped = batch if modified == len(ids) else await self._flipped(ids, run_id)
+                    await self.on_updated(flipped)
+                if len(ids) < self.batch_size:
+                    break
+        except Exception as e:
+            run["error"] = str(e)
+            logger.exception("Overdue invoice sweep failed")
+        run["duration_ms"] = (time.perf_counter() - start) * 1000
+
+        self.runs += 1
+        self.total_updated += run["updated"]
+        self.last_run = run
+        if run["updated"]:
+            logger.info("Marked %d invoices overdue in %d batches", run["updated"], run["batches"])
+        return run
+
+    async def _flipped(self, ids, run_id):
+        # Invoices of a batch this run set to overdue, as they were before the sweep
+        projection = {**self.PROJECTION, "swept_by": 1}
+        current = await asyncio.gather(*(self.invoices.get(doc_id, projection) for doc_id in ids))
+        return [
+            {**{field: value for field, value in doc.items() if field != "swept_by"}, "status": "pending"}
+            for doc in current if doc and doc.get("swept_by") == run_id and doc.get("status") == "overdue"
+        ]
+
+    async def run_periodically(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def metrics(self):
+        return {
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "total_updated": self.total_updated,
+            "last_run": self.last_run,
+        }
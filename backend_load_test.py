@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the Freelance Project Management API
+Runs a weighted mix of dashboard, list, detail and write calls at one or more
+concurrency levels and reports throughput and p50/p95/p99 latency per endpoint.
+Results are written as JSON so runs can be compared across commits.
+
+Drives the FastAPI app in-process (default; needs MONGO_URL/DB_NAME, e.g. a
+local mongod), in-process on the in-memory store with --memory (no database
+needed), or a running server with --target http://localhost:8001.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+
+DEFAULT_MIX = "dashboard=2,list=3,detail=4,write=1"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, errors, elapsed):
+    latencies = sorted(samples)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(LoadTester.OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LoadTester:
+    OPERATIONS = ("dashboard", "list", "detail", "write")
+
+    def __init__(self, http, seed_size):
+        self.http = http
+        self.seed_size = seed_size
+        self.ids = {"clients": [], "projects": [], "invoices": []}
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def log(self, message, level="INFO"):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] {level}: {message}", file=sys.stderr)
+
+    async def seed(self):
+        """Create the records the detail and list calls read, in bulk."""
+        self.log(f"Seeding {self.seed_size} clients, projects and invoices...")
+        due = (datetime.utcnow() + timedelta(days=30)).date().isoformat()
+        batches = {
+            "clients": [
+                {"name": f"Load Client {i}", "email": f"load{i}@example.com", "company": f"Company {i % 20}"}
+                for i in range(self.seed_size)
+            ],
+            "projects": [
+                {"name": f"Load Project {i}", "client": f"Load Client {i % 50}", "budget": 1000 + i,
+                 "start_date": "2025-01-01", "description": "Load test project"}
+                for i in range(self.seed_size)
+            ],
+            "invoices": [
+                {"client": f"Load Client {i % 50}", "project": f"Load Project {i % 80}", "amount": 100 + i,
+                 "due_date": due, "description": "Load test invoice", "hours": 4, "rate": 25}
+                for i in range(self.seed_size)
+            ],
+        }
+        for collection, items in batches.items():
+            for start in range(0, len(items), 500):
+                response = await self.http.post(f"/api/{collection}/bulk", json=items[start:start + 500])
+                response.raise_for_status()
+                self.ids[collection] += [r["id"] for r in response.json()["results"] if r["success"]]
+
+    async def discover(self, limit=500):
+        """Without seeding, pick up existing ids for the detail and write calls."""
+        for collection in self.ids:
+            response = await self.http.get(f"/api/{collection}", params={"limit": limit, "fields": "id"})
+            response.raise_for_status()
+            self.ids[collection] = [doc["id"] for doc in response.json()]
+        self.log("Found " + ", ".join(f"{len(ids)} {name}" for name, ids in self.ids.items()))
+
+    async def dashboard(self):
+        return "GET /api/dashboard", await self.http.get("/api/dashboard")
+
+    async def list(self):
+        collection = random.choice(list(self.ids))
+        return f"GET /api/{collection}", await self.http.get(f"/api/{collection}", params={"limit": 50})
+
+    async def detail(self):
+        known = [name for name, ids in self.ids.items() if ids]
+        if not known:
+            # Nothing to fetch by id yet on an empty target
+            return await self.list()
+        collection = random.choice(known)
+        route = f"GET /api/{collection}/{{id}}"
+        return route, await self.http.get(f"/api/{collection}/{random.choice(self.ids[collection])}")
+
+    async def write(self):
+        if self.ids["invoices"] and random.random() < 0.5:
+            invoice_id = random.choice(self.ids["invoices"])
+            response = await self.http.put(f"/api/invoices/{invoice_id}", json={"amount": random.randint(100, 999)})
+            return "PUT /api/invoices/{id}", response
+        response = await self.http.post("/api/invoices", json={
+            "client": f"Load Client {random.randrange(50)}", "project": "Load Project 0",
+            "amount": random.randint(100, 999), "due_date": "2030-01-01",
+        })
+        if response.status_code == 200:
+            self.ids["invoices"].append(response.json()["id"])
+        return "POST /api/invoices", response
+
+    async def worker(self, operations, weights, deadline):
+        while time.perf_counter() < deadline:
+            operation = random.choices(operations, weights)[0]
+            start = time.perf_counter()
+            try:
+                route, response = await getattr(self, operation)()
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                route, failed = operation, True
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if failed:
+                self.errors[route] += 1
+            else:
+                self.samples[route].append(elapsed_ms)
+
+    async def run_level(self, concurrency, duration, mix):
+        self.samples.clear()
+        self.errors.clear()
+        operations = list(mix)
+        weights = [mix[name] for name in operations]
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(self.worker(operations, weights, deadline) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        routes = sorted(set(self.samples) | set(self.errors))
+        endpoints = {route: summarize(self.samples[route], self.errors[route], elapsed) for route in routes}
+        all_samples = [sample for samples in self.samples.values() for sample in samples]
+        overall = summarize(all_samples, sum(self.errors.values()), elapsed)
+        self.log(f"concurrency={concurrency}: {overall['throughput_rps']} req/s, "
+                 f"p50={overall['p50_ms']} ms, p99={overall['p99_ms']} ms, errors={overall['errors']}")
+        return {"concurrency": concurrency, "duration_s": round(elapsed, 3), "overall": overall,
+                "endpoints": endpoints, "pool": await self.pool_stats()}
+
+    async def pool_stats(self):
+        """Connection pool checkout stats from the readiness endpoint, cumulative since startup."""
+        try:
+            return (await self.http.get("/api/health/ready")).json().get("pool")
+        except (httpx.HTTPError, ValueError):
+            return None
+
+
+def in_process_app(memory=False):
+    sys.path.insert(0, str(ROOT_DIR / 'backend'))
+    import server  # noqa: E402
+    from memory_store import memory_storage  # noqa: E402
+    return server.create_app(storage=memory_storage() if memory else None)
+
+
+async def run_levels(http, args, mix, concurrency_levels):
+    tester = LoadTester(http, args.seed)
+    if args.seed:
+        await tester.seed()
+    else:
+        await tester.discover()
+    levels = []
+    for concurrency in concurrency_levels:
+        levels.append(await tester.run_level(concurrency, args.duration, mix))
+    return tester, levels
+
+
+async def main(args):
+    mix = parse_mix(args.mix)
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    if args.target:
+        async with httpx.AsyncClient(base_url=args.target.rstrip("/"), timeout=args.timeout) as http:
+            tester, levels = await run_levels(http, args, mix, concurrency_levels)
+    else:
+        app = in_process_app(memory=args.memory)
+        # ASGITransport does not send lifespan events, so run the lifespan here
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as http:
+                tester, levels = await run_levels(http, args, mix, concurrency_levels)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "target": args.target or ("in-process memory" if args.memory else "in-process"),
+        "mix": mix,
+        "duration_s": args.duration,
+        "seed": args.seed,
+        "levels": levels,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+        tester.log(f"Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=os.environ.get("LOAD_TEST_TARGET"),
+                        help="base URL of a running server; omit to drive the app in-process")
+    parser.add_argument("--memory", action="store_true",
+                        help="drive the app in-process on the in-memory store instead of MongoDB")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"weighted operations, from {', '.join(LoadTester.OPERATIONS)} (default: {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--seed", type=int, default=200, help="records per collection to create first; 0 reuses existing records")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds for --target")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    asyncio.run(main(parser.parse_args()))
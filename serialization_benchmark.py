@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the list endpoints
+Compares the per-document cost of the original response path (Model(**doc)
+per document, then FastAPI's response_model validation and JSON encoding)
+with the TypeAdapter fast path in backend/serialization.py
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+from models import Client, Project, Invoice  # noqa: E402
+from serialization import encode_list  # noqa: E402
+from tests.factories import make_docs  # noqa: E402
+
+
+def baseline_path(model, field, docs):
+    # What the list endpoints did before: build a model per document, let
+    # FastAPI validate them again against response_model, then json.dumps
+    objs = []
+    for doc in docs:
+        doc = dict(doc)
+        doc["_id"] = str(doc["_id"])
+        objs.append(model(**doc))
+    content = asyncio.run(serialize_response(field=field, response_content=objs))
+    return JSONResponse(content).body
+
+
+def fast_path(model, field, docs):
+    return encode_list(model, docs)
+
+
+def measure(fn, model, field, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(model, field, docs)
+        best = min(best, time.perf_counter() - start)
+    return best / len(docs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=1000, help="documents per list response")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    print(f"{'model':<10}{'before µs/doc':>15}{'after µs/doc':>15}{'speedup':>10}")
+    for entity, model in (("client", Client), ("project", Project), ("invoice", Invoice)):
+        docs = make_docs(entity, args.docs)
+        field = create_response_field(name=f"Response_{model.__name__}", type_=list[model])
+        before = measure(baseline_path, model, field, docs, args.repeat)
+        after = measure(fast_path, model, field, docs, args.repeat)
+        print(f"{model.__name__:<10}{before:>15.2f}{after:>15.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import gc
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from indexes import ensure_indexes  # noqa: E402
+from memory_store import memory_storage  # noqa: E402
+from repository import motor_storage  # noqa: E402
+from server import create_app  # noqa: E402
+
+# Behaviour tests run on the in-memory backend. Modules that also cover the
+# MongoDB implementations parametrize the storage fixture with STORAGE_BACKENDS;
+# the "mongo" runs use a throwaway database on MONGO_TEST_URL and are skipped
+# when it is not set.
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+STORAGE_BACKENDS = ["memory", "mongo"]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def storage(request):
+    if getattr(request, "param", "memory") == "memory":
+        yield memory_storage()
+        return
+    if not MONGO_TEST_URL:
+        pytest.skip("MONGO_TEST_URL is not set")
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGO_TEST_URL)
+    db = client[f"test_{uuid.uuid4().hex[:12]}"]
+    await ensure_indexes(db)
+    try:
+        yield motor_storage(db)
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+@pytest.fixture
+async def app(storage):
+    app = create_app(storage=storage)
+    # ASGITransport does not send lifespan events, so run the lifespan here
+    async with app.router.lifespan_context(app):
+        yield app
+
+
+@pytest.fixture
+async def http(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+# Microbenchmarks compare their best time per call against the stored
+# baseline and fail when it has grown by more than the tolerance. Being
+# timing-gated they only run when asked for with --bench. Timings are
+# stored relative to a fixed pure-Python calibration workload timed right
+# before each benchmark, so a baseline recorded on one machine (or a busier
+# moment on the same one) still compares fairly. Refresh it with
+# --bench-save-baseline and commit it with the change it measures.
+BASELINE_PATH = Path(__file__).parent / 'benchmark_baseline.json'
+DEFAULT_TOLERANCE = 1.0
+MIN_ROUND_SECONDS = 0.005
+ROUNDS = 7
+
+_results = {}
+
+
+def _calibration_workload():
+    return [{"id": str(i), "amount": i * 1.5, "status": "pending"} for i in range(1000)]
+
+
+def calibration_seconds():
+    timings = []
+    for _ in range(ROUNDS * 3):
+        start = time.perf_counter()
+        _calibration_workload()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench")
+    group.addoption("--bench", action="store_true", help="run the benchmark tests, skipped by default")
+    group.addoption("--bench-save-baseline", action="store_true",
+                    help="run the benchmarks and store their timings as the new baseline")
+    group.addoption("--bench-tolerance", type=float, default=DEFAULT_TOLERANCE,
+                    help="allowed slowdown against the baseline as a fraction (default: 1.0, i.e. twice as slow)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: microbenchmark compared against the stored baseline")
+
+
+def pytest_collection_modifyitems(config, items):
+    if not (config.getoption("--bench") or config.getoption("--bench-save-baseline")):
+        skip = pytest.mark.skip(reason="benchmarks run with --bench")
+        for item in items:
+            if "bench" in item.keywords:
+                item.add_marker(skip)
+
+
+def _load_baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text())
+    return {}
+
+
+class Benchmark:
+    """Times a callable, as the bench fixture: bench(fn, *args).
+
+    Each round loops fn until it has run for at least MIN_ROUND_SECONDS and
+    the best seconds per call over ROUNDS rounds is kept. With setup=, fn
+    gets fresh arguments from setup() each round and runs once per round, for
+    callables that mutate their input.
+    """
+
+    def __init__(self, name, baseline, tolerance):
+        self.name = name
+        self.baseline = baseline
+        self.tolerance = tolerance
+
+    def __call__(self, fn, *args, setup=None):
+        best, relative, result = self._measure(fn, args, setup)
+        expected = self.baseline.get(self.name)
+        if expected and relative > expected * (1 + self.tolerance):
+            # One noisy neighbour is enough to blow a round; a real
+            # regression survives a second measurement
+            retry_best, retry_relative, _ = self._measure(fn, args, setup)
+            if retry_relative < relative:
+                best, relative = retry_best, retry_relative
+        _results[self.name] = (best, relative)
+        if expected and relative > expected * (1 + self.tolerance):
+            pytest.fail(
+                f"{self.name}: {best * 1e6:.1f} µs per call, "
+                f"{(relative / expected - 1) * 100:+.0f}% against the baseline "
+                f"(tolerance {self.tolerance * 100:.0f}%)"
+            )
+        return result
+
+    def _measure(self, fn, args, setup):
+        # Collector pauses depend on whatever else the session has allocated,
+        # so they are kept out of the timings the way timeit does
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            calibration = calibration_seconds()
+            timings, result = self._time(fn, args, setup)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        best = min(timings)
+        return best, best / calibration, result
+
+    def _time(self, fn, args, setup):
+        if setup is not None:
+            timings = []
+            for _ in range(ROUNDS):
+                round_args = setup()
+                start = time.perf_counter()
+                result = fn(*round_args)
+                timings.append(time.perf_counter() - start)
+            return timings, result
+
+        result = fn(*args)
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn(*args)
+            if time.perf_counter() - start >= MIN_ROUND_SECONDS:
+                break
+            loops *= 2
+        timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn(*args)
+            timings.append((time.perf_counter() - start) / loops)
+        return timings, result
+
+
+# Named apart from pytest-benchmark's fixture and options so both can be installed
+@pytest.fixture
+def bench(request):
+    config = request.config
+    baseline = {} if config.getoption("--bench-save-baseline") else _load_baseline()
+    name = request.node.nodeid.split("::", 1)[-1]
+    return Benchmark(name, baseline, config.getoption("--bench-tolerance"))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _results:
+        return
+    baseline = _load_baseline()
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(f"{'benchmark':<60}{'µs/call':>14}{'relative':>12}{'change':>9}")
+    for name, (seconds, relative) in sorted(_results.items()):
+        expected = baseline.get(name)
+        change = f"{(relative / expected - 1) * 100:+.0f}%" if expected else "new"
+        terminalreporter.write_line(f"{name:<60}{seconds * 1e6:>14.1f}{relative:>12.4f}{change:>9}")
+
+    if config.getoption("--bench-save-baseline"):
+        baseline.update({name: round(relative, 6) for name, (_, relative) in _results.items()})
+        BASELINE_PATH.write_text(json.dumps(dict(sorted(baseline.items())), indent=2) + "\n")
+        terminalreporter.write_line(f"Baseline written to {BASELINE_PATH}")
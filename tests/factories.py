@@ -0,0 +1,49 @@
+"""
+Document factories shared by the model microbenchmarks and
+serialization_benchmark.py
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from models import Client, ClientCreate, Invoice, InvoiceCreate, Project, ProjectCreate
+
+# entity -> (stored model, create model, creation date field)
+MODELS = {
+    "client": (Client, ClientCreate, "join_date"),
+    "project": (Project, ProjectCreate, "created_date"),
+    "invoice": (Invoice, InvoiceCreate, "created_date"),
+}
+
+
+def make_payloads(entity, count):
+    """Create request bodies, as the POST endpoints receive them."""
+    if entity == "client":
+        return [{"name": f"Client {i}", "email": f"client{i}@example.com",
+                 "phone": "555-0100", "company": "Acme"} for i in range(count)]
+    if entity == "project":
+        return [{"name": f"Project {i}", "client": f"Client {i % 50}", "budget": 1000.0 + i,
+                 "start_date": "2025-01-01", "description": "Website redesign"} for i in range(count)]
+    return [{"client": f"Client {i % 50}", "project": f"Project {i % 80}", "amount": 250.0 + i,
+             "due_date": "2025-02-01", "description": "Monthly retainer", "agent_name": "Agent",
+             "agent_phone": "555-0101", "agent_email": "agent@example.com", "hours": 10.0, "rate": 25.0}
+            for i in range(count)]
+
+
+def stored_fields(entity, i):
+    """Fields the server fills in beyond the model defaults."""
+    return {"invoice_number": f"INV-{i:06d}"} if entity == "invoice" else {}
+
+
+def make_docs(entity, count):
+    """Documents shaped as they come back from Motor, _id included."""
+    model, _, date_field = MODELS[entity]
+    now = datetime(2025, 1, 1)
+    docs = []
+    for i, payload in enumerate(make_payloads(entity, count)):
+        doc = model(**payload, **stored_fields(entity, i)).dict()
+        doc["_id"] = ObjectId()
+        doc[date_field] = now - timedelta(minutes=i)
+        docs.append(doc)
+    return docs
@@ -0,0 +1,21 @@
+"""
+Helpers shared by the API behaviour tests
+"""
+
+
+async def create_invoice(http, **fields):
+    payload = {"client": "Acme", "project": "Website", "amount": 100, "due_date": "2099-01-01", **fields}
+    response = await http.post("/api/invoices", json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def all_pages(http, path, **params):
+    docs, cursor = [], None
+    while True:
+        response = await http.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        docs += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return docs
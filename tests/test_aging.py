@@ -0,0 +1,115 @@
+"""
+Tests for the receivables aging report
+The buckets are computed by an aggregation pipeline on MongoDB and by
+aging_bucket on the in-memory store, so the edges are checked on both.
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import Invoice
+from reports import AGING_BUCKETS, OVER_90, aging_bucket
+from tests.conftest import STORAGE_BACKENDS
+from tests.helpers import create_invoice
+
+AS_OF = date(2025, 3, 1)
+BUCKETS = [name for _, name in AGING_BUCKETS] + [OVER_90]
+
+# Days past due -> bucket, on both sides of every edge
+EDGES = [
+    (-1, "current"), (0, "current"),
+    (1, "days_1_30"), (30, "days_1_30"),
+    (31, "days_31_60"), (60, "days_31_60"),
+    (61, "days_61_90"), (90, "days_61_90"),
+    (91, "days_over_90"),
+]
+
+
+def due(days_past_due):
+    return (AS_OF - timedelta(days=days_past_due)).isoformat()
+
+
+@pytest.mark.parametrize("days_past_due, bucket", EDGES)
+def test_aging_bucket_edges(days_past_due, bucket):
+    assert aging_bucket(due(days_past_due), datetime(2025, 3, 1)) == bucket
+
+
+@pytest.mark.parametrize("due_date, bucket", [
+    ("2025-02-28T12:00:00", "current"),
+    ("2025-02-28T00:00:00+02:00", "days_1_30"),
+    ("soon", "current"),
+    ("", "current"),
+    (None, "current"),
+])
+def test_aging_bucket_of_odd_due_dates(due_date, bucket):
+    assert aging_bucket(due_date, datetime(2025, 3, 1)) == bucket
+
+
+async def aging(http, as_of=AS_OF):
+    response = await http.get("/api/reports/aging", params={"as_of": as_of.isoformat()})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)
+async def test_report_buckets_at_the_edges(http):
+    for days_past_due, _ in EDGES:
+        await create_invoice(http, client=f"Client {days_past_due}", amount=10, due_date=due(days_past_due))
+
+    report = await aging(http)
+
+    buckets = {entry["client"]: next(name for name in BUCKETS if entry[name]) for entry in report["clients"]}
+    assert buckets == {f"Client {days_past_due}": bucket for days_past_due, bucket in EDGES}
+    assert report["as_of"] == AS_OF.isoformat()
+    assert (report["totals"]["current"], report["totals"]["days_over_90"]) == (20, 10)
+    assert (report["totals"]["total"], report["totals"]["count"]) == (90, 9)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)
+async def test_unparseable_or_missing_due_dates_count_as_current(app, http):
+    await create_invoice(http, amount=10, due_date="soon")
+    doc = Invoice(invoice_number="LEGACY-1", client="Acme", project="Website", amount=20, due_date="x").dict()
+    del doc["due_date"]
+    await app.state.services.storage.invoices.insert(doc)
+
+    report = await aging(http)
+
+    assert (report["totals"]["current"], report["totals"]["count"]) == (30, 2)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)
+async def test_report_groups_unpaid_invoices_by_client(http):
+    for client, amount, status, days_past_due in [
+        ("Acme", 100, "pending", 10), ("Acme", 50, "overdue", 45), ("Acme", 1000, "paid", 45),
+        ("Beta", 300, "overdue", 120), ("Gamma", 5, "pending", -10),
+    ]:
+        await create_invoice(http, client=client, amount=amount, status=status, due_date=due(days_past_due))
+
+    report = await aging(http)
+
+    assert [entry["client"] for entry in report["clients"]] == ["Beta", "Acme", "Gamma"]
+    acme = report["clients"][1]
+    assert (acme["days_1_30"], acme["days_31_60"], acme["total"], acme["count"]) == (100, 50, 150, 2)
+    assert report["totals"] == {
+        "current": 5, "days_1_30": 100, "days_31_60": 50, "days_61_90": 0, "days_over_90": 300,
+        "total": 455, "count": 4,
+    }
+
+
+@pytest.mark.anyio
+async def test_invoice_writes_invalidate_the_cached_report(http):
+    invoice = await create_invoice(http, amount=100, due_date=due(10))
+    assert (await aging(http))["totals"]["days_1_30"] == 100
+
+    await http.patch(f"/api/invoices/{invoice['id']}", json={"amount": 150})
+    assert (await aging(http))["totals"]["days_1_30"] == 150
+
+    await create_invoice(http, amount=20, due_date=due(40))
+    assert (await aging(http))["totals"]["days_31_60"] == 20
+
+    await http.patch(f"/api/invoices/{invoice['id']}", json={"status": "paid"})
+    assert (await aging(http))["totals"]["total"] == 20
@@ -0,0 +1,34 @@
+"""
+Tests for the app lifecycle: per-app state and requests before startup
+Feature tests live in their own modules; each gets its own app from the
+conftest app fixture, with its lifespan running.
+"""
+
+import httpx
+import pytest
+
+from memory_store import memory_storage
+from server import create_app
+from tests.helpers import create_invoice
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_apps_do_not_share_state(http):
+    await create_invoice(http)
+    other = create_app(storage=memory_storage())
+
+    async with other.router.lifespan_context(other):
+        transport = httpx.ASGITransport(app=other)
+        async with httpx.AsyncClient(transport=transport, base_url="http://other") as other_http:
+            response = await other_http.get("/api/invoices")
+
+    assert response.json() == []
+    assert len((await http.get("/api/invoices")).json()) == 1
+
+
+async def test_requests_before_startup_are_503():
+    app = create_app(storage=memory_storage())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        assert (await http.get("/api/clients")).status_code == 503
+        assert (await http.get("/api/health/ready")).json() == {"status": "starting"}
@@ -0,0 +1,47 @@
+"""
+Tests for the bulk create endpoints
+"""
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_bulk_create_reports_errors_per_item(app, http):
+    # Take the first number the allocator will hand out, so the first valid
+    # item fails on the unique invoice_number index
+    await app.state.services.storage.invoices.insert({"id": "existing", "invoice_number": "INV-000001"})
+    items = [
+        {"client": "Acme", "project": "Website", "amount": 100, "due_date": "2099-01-01"},
+        {"client": "Acme", "project": "Website", "amount": "lots", "due_date": "2099-01-01"},
+        {"client": "Acme", "project": "Website", "amount": 300, "due_date": "2099-01-01"},
+    ]
+
+    response = await http.post("/api/invoices/bulk", json=items)
+
+    report = response.json()
+    assert response.status_code == 200
+    assert (report["inserted"], report["failed"]) == (1, 2)
+    duplicate, invalid, created = report["results"]
+    assert [result["index"] for result in report["results"]] == [0, 1, 2]
+    assert not duplicate["success"] and "invoice_number" in duplicate["error"]
+    assert not invalid["success"] and invalid["error"].startswith("amount:")
+    assert created["success"]
+    assert (await http.get(f"/api/invoices/{created['id']}")).json()["amount"] == 300
+
+
+async def test_bulk_create_over_the_limit_is_413(http):
+    response = await http.post("/api/clients/bulk", json=[{"name": "x", "email": "x@example.com"}] * 1001)
+
+    assert response.status_code == 413
+
+
+async def test_bulk_created_clients_are_listed_and_counted(http):
+    clients = [{"name": f"Client {i}", "email": f"client{i}@example.com"} for i in range(3)]
+
+    report = (await http.post("/api/clients/bulk", json=clients)).json()
+
+    assert (report["inserted"], report["failed"]) == (3, 0)
+    listed = {client["id"] for client in (await http.get("/api/clients")).json()}
+    assert listed == {result["id"] for result in report["results"]}
+    assert (await http.get("/api/dashboard")).json()["total_clients"] == 3
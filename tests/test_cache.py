@@ -0,0 +1,103 @@
+"""
+Tests for the TTL/LRU entity cache and its invalidation on writes
+"""
+
+import pytest
+
+from cache import TTLCache
+from tests.helpers import create_invoice
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("a", 1)
+
+    clock.now = 29.9
+    assert cache.get("a") == 1
+    clock.now = 30
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+async def cache_stats(http):
+    return (await http.get("/api/admin/cache")).json()
+
+
+@pytest.mark.anyio
+async def test_repeated_gets_are_served_from_the_cache(http):
+    client_id = (await http.post("/api/clients", json={"name": "Acme", "email": "a@example.com"})).json()["id"]
+
+    for _ in range(3):
+        assert (await http.get(f"/api/clients/{client_id}")).status_code == 200
+
+    stats = await cache_stats(http)
+    assert (stats["size"], stats["misses"], stats["hits"]) == (1, 1, 2)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("method, body", [("put", {"name": "Renamed"}), ("patch", {"name": "Renamed"})])
+async def test_updates_invalidate_the_cached_client(http, method, body):
+    client_id = (await http.post("/api/clients", json={"name": "Acme", "email": "a@example.com"})).json()["id"]
+    await http.get(f"/api/clients/{client_id}")
+
+    await http.request(method.upper(), f"/api/clients/{client_id}", json=body)
+    response = await http.get(f"/api/clients/{client_id}")
+
+    assert response.json()["name"] == "Renamed"
+    stats = await cache_stats(http)
+    assert (stats["misses"], stats["hits"]) == (2, 0)
+
+
+@pytest.mark.anyio
+async def test_delete_invalidates_the_cached_client(http):
+    client_id = (await http.post("/api/clients", json={"name": "Acme", "email": "a@example.com"})).json()["id"]
+    await http.get(f"/api/clients/{client_id}")
+
+    await http.delete(f"/api/clients/{client_id}")
+
+    assert (await http.get(f"/api/clients/{client_id}")).status_code == 404
+    assert (await cache_stats(http))["size"] == 0
+
+
+@pytest.mark.anyio
+async def test_invoice_writes_invalidate_the_cached_invoice(http):
+    invoice = await create_invoice(http, amount=100)
+    path = f"/api/invoices/{invoice['id']}"
+    await http.get(path)
+
+    await http.patch(path, json={"amount": 175})
+    amount = (await http.get(path)).json()["amount"]
+    await http.delete(path)
+
+    assert amount == 175
+    assert (await http.get(path)).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_sparse_gets_bypass_the_cache(http):
+    client_id = (await http.post("/api/clients", json={"name": "Acme", "email": "a@example.com"})).json()["id"]
+
+    response = await http.get(f"/api/clients/{client_id}", params={"fields": "name"})
+
+    assert response.json() == {"id": client_id, "name": "Acme"}
+    assert (await cache_stats(http))["size"] == 0
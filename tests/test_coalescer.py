@@ -0,0 +1,134 @@
+"""
+Tests for the insert coalescer, on an in-memory repository and behind the
+create endpoints
+"""
+
+import asyncio
+import functools
+
+import pytest
+
+import server
+from coalescer import InsertCoalescer
+from memory_store import InMemoryRepository
+from repository import DuplicateDocument
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_inserts_share_one_batch():
+    repository = InMemoryRepository("clients")
+    coalescer = InsertCoalescer(repository, max_batch=10, max_delay_ms=5)
+
+    await asyncio.gather(*(coalescer.insert({"id": str(i)}) for i in range(4)))
+
+    assert sorted(repository.docs) == ["0", "1", "2", "3"]
+    assert (coalescer.batches, coalescer.documents) == (1, 4)
+
+
+async def test_full_batch_is_written_without_waiting():
+    repository = InMemoryRepository("clients")
+    coalescer = InsertCoalescer(repository, max_batch=2, max_delay_ms=60_000)
+
+    await asyncio.wait_for(asyncio.gather(coalescer.insert({"id": "a"}), coalescer.insert({"id": "b"})), 1)
+
+    assert coalescer.batches == 1
+
+
+async def test_duplicate_fails_only_its_own_caller():
+    repository = InMemoryRepository("clients")
+    await repository.insert({"id": "taken"})
+    coalescer = InsertCoalescer(repository, max_batch=10, max_delay_ms=5)
+
+    results = await asyncio.gather(
+        coalescer.insert({"id": "first"}),
+        coalescer.insert({"id": "taken"}),
+        coalescer.insert({"id": "last"}),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], DuplicateDocument)
+    assert {"first", "last"} <= set(repository.docs)
+    assert coalescer.batches == 1
+
+
+async def test_failed_batch_fails_every_caller():
+    class BrokenRepository(InMemoryRepository):
+        async def insert_many(self, docs):
+            raise ConnectionError("database unavailable")
+
+    coalescer = InsertCoalescer(BrokenRepository("clients"), max_batch=10, max_delay_ms=5)
+
+    results = await asyncio.gather(
+        *(coalescer.insert({"id": str(i)}) for i in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert coalescer.failed_batches == 1
+
+
+async def test_close_writes_pending_documents():
+    repository = InMemoryRepository("clients")
+    coalescer = InsertCoalescer(repository, max_batch=10, max_delay_ms=60_000)
+
+    waiting = asyncio.create_task(coalescer.insert({"id": "pending"}))
+    await asyncio.sleep(0)
+    await coalescer.close()
+    await waiting
+
+    assert "pending" in repository.docs
+
+
+async def test_metrics_report_batch_sizes():
+    coalescer = InsertCoalescer(InMemoryRepository("clients"), max_batch=10, max_delay_ms=5)
+
+    await asyncio.gather(*(coalescer.insert({"id": str(i)}) for i in range(3)))
+    await coalescer.insert({"id": "alone"})
+
+    metrics = coalescer.metrics()
+    assert (metrics["batches"], metrics["documents"], metrics["pending"]) == (2, 4, 0)
+    assert metrics["batch_size"]["avg"] == 2.0
+    assert metrics["batch_size"]["max"] == 3
+
+
+@pytest.fixture
+def coalescing(monkeypatch):
+    # AppServices reads these when the app starts, so patch before the app fixture
+    monkeypatch.setattr(server, "INSERT_COALESCE_ENABLED", True)
+    monkeypatch.setattr(server, "InsertCoalescer", functools.partial(InsertCoalescer, max_delay_ms=50))
+
+
+async def test_coalescing_is_off_by_default(http):
+    response = await http.get("/api/admin/coalescer")
+
+    assert response.json() == {"enabled": False, "collections": {}}
+
+
+async def test_concurrent_creates_share_one_insert(coalescing, http):
+    responses = await asyncio.gather(*(
+        http.post("/api/clients", json={"name": f"Client {i}", "email": f"client{i}@example.com"})
+        for i in range(5)
+    ))
+
+    assert [response.status_code for response in responses] == [200] * 5
+    listed = (await http.get("/api/clients", params={"limit": 10})).json()
+    assert sorted(client["id"] for client in listed) == sorted(response.json()["id"] for response in responses)
+    metrics = (await http.get("/api/admin/coalescer")).json()
+    assert metrics["enabled"] is True
+    assert (metrics["collections"]["clients"]["batches"], metrics["collections"]["clients"]["documents"]) == (1, 5)
+    assert metrics["collections"]["invoices"]["documents"] == 0
+
+
+async def test_coalesced_invoice_creates_get_distinct_numbers(coalescing, http):
+    responses = await asyncio.gather(*(
+        http.post("/api/invoices", json={"client": "Acme", "project": "Website", "amount": 10 * i,
+                                         "due_date": "2099-01-01"})
+        for i in range(1, 6)
+    ))
+
+    numbers = [response.json()["invoice_number"] for response in responses]
+    assert len(set(numbers)) == 5
+    assert len((await http.get("/api/invoices")).json()) == 5
+    metrics = (await http.get("/api/admin/coalescer")).json()
+    assert metrics["collections"]["invoices"]["batches"] == 1
@@ -0,0 +1,62 @@
+"""
+Tests for ETag validators and 304 responses on list and detail GETs
+"""
+
+import pytest
+
+from tests.helpers import create_invoice
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_detail_etag_gives_304_until_the_document_changes(http):
+    invoice = await create_invoice(http)
+    path = f"/api/invoices/{invoice['id']}"
+    etag = (await http.get(path)).headers["ETag"]
+
+    not_modified = await http.get(path, headers={"If-None-Match": etag})
+    await http.patch(path, json={"amount": 250})
+    modified = await http.get(path, headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert modified.status_code == 200
+    assert modified.headers["ETag"] != etag
+
+
+async def test_list_etag_gives_304_until_a_write(http):
+    await create_invoice(http)
+    etag = (await http.get("/api/invoices")).headers["ETag"]
+
+    not_modified = await http.get("/api/invoices", headers={"If-None-Match": etag})
+    other_query = await http.get("/api/invoices", params={"limit": 1}, headers={"If-None-Match": etag})
+    await create_invoice(http)
+    modified = await http.get("/api/invoices", headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert other_query.status_code == 200
+    assert modified.status_code == 200
+    assert len(modified.json()) == 2
+
+
+@pytest.mark.parametrize("if_none_match", ["*", 'W/"other", {etag}', "{strong}"])
+async def test_if_none_match_forms_that_match(http, if_none_match):
+    invoice = await create_invoice(http)
+    path = f"/api/invoices/{invoice['id']}"
+    etag = (await http.get(path)).headers["ETag"]
+
+    header = if_none_match.format(etag=etag, strong=etag.removeprefix("W/"))
+    response = await http.get(path, headers={"If-None-Match": header})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+async def test_sparse_and_full_detail_etags_differ(http):
+    invoice = await create_invoice(http)
+    path = f"/api/invoices/{invoice['id']}"
+
+    full = (await http.get(path)).headers["ETag"]
+    sparse = (await http.get(path, params={"fields": "amount"})).headers["ETag"]
+
+    assert full != sparse
@@ -0,0 +1,85 @@
+"""
+Tests for the streaming NDJSON and CSV export endpoints
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+import export
+from models import Invoice
+from tests.helpers import create_invoice
+
+pytestmark = pytest.mark.anyio
+
+
+async def seed_invoices(http):
+    return [
+        await create_invoice(http, client=client, amount=amount, status=status)
+        for client, amount, status in [
+            ("Acme", 100, "pending"), ("Acme", 200, "paid"), ("Beta", 300, "pending"), ("Beta", 400, "paid"),
+        ]
+    ]
+
+
+async def test_ndjson_export_streams_every_invoice_newest_first(http):
+    invoices = await seed_invoices(http)
+
+    response = await http.get("/api/invoices/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="invoices.ndjson"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [invoice["id"] for invoice in reversed(invoices)]
+    assert all(list(row) == list(Invoice.model_fields) for row in rows)
+    assert rows[0]["created_date"] == invoices[-1]["created_date"]
+
+
+async def test_csv_export_has_a_header_and_one_row_per_invoice(http):
+    invoices = await seed_invoices(http)
+
+    response = await http.get("/api/invoices/export", params={"format": "csv"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == list(Invoice.model_fields)
+    assert [row[header.index("id")] for row in rows] == [invoice["id"] for invoice in reversed(invoices)]
+    # None is written as an empty cell
+    assert rows[0][header.index("description")] == ""
+
+
+async def test_export_applies_the_list_filters(http):
+    await seed_invoices(http)
+
+    response = await http.get("/api/invoices/export", params={"status": "paid"})
+
+    assert [json.loads(line)["amount"] for line in response.text.splitlines()] == [400, 200]
+
+
+async def test_export_rejects_filters_the_list_endpoint_rejects(http):
+    response = await http.get("/api/invoices/export", params={"status": "paid", "sort": "amount"})
+
+    assert response.status_code == 400
+
+
+async def test_export_resumes_from_a_list_cursor(http):
+    invoices = await seed_invoices(http)
+    cursor = (await http.get("/api/invoices", params={"limit": 1})).headers["X-Next-Cursor"]
+
+    response = await http.get("/api/invoices/export", params={"cursor": cursor})
+
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == \
+        [invoice["id"] for invoice in reversed(invoices[:-1])]
+
+
+async def test_export_spans_several_batches(http, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    clients = [{"name": f"Client {i}", "email": f"client{i}@example.com"} for i in range(5)]
+    await http.post("/api/clients/bulk", json=clients)
+
+    response = await http.get("/api/clients/export", params={"format": "csv"})
+
+    assert len(response.text.splitlines()) == 6
@@ -0,0 +1,88 @@
+"""
+Tests for the Prometheus /metrics endpoint
+"""
+
+import re
+
+import pytest
+
+from metrics import LATENCY_BUCKETS, PROMETHEUS_CONTENT_TYPE
+from tests.helpers import create_invoice
+
+pytestmark = pytest.mark.anyio
+
+SAMPLE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+
+
+async def scrape(http):
+    response = await http.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        samples[name, labels] = float(value)
+    return samples
+
+
+def buckets(samples, labels):
+    return [samples["http_request_duration_seconds_bucket", f'{labels},le="{bound}"'] for bound in LATENCY_BUCKETS] + \
+        [samples["http_request_duration_seconds_bucket", f'{labels},le="+Inf"']]
+
+
+async def test_requests_are_labelled_by_route_template(http):
+    invoice = await create_invoice(http)
+    for _ in range(3):
+        await http.get(f"/api/invoices/{invoice['id']}")
+
+    samples = await scrape(http)
+
+    route = 'method="GET",route="/api/invoices/{invoice_id}"'
+    assert samples["http_requests_total", f'{route},status="200"'] == 3
+    assert samples["http_request_duration_seconds_count", route] == 3
+    assert not any(invoice["id"] in labels for _, labels in samples)
+
+
+async def test_unknown_paths_share_the_unmatched_label(http):
+    await http.get("/api/nothing-here")
+    await http.get("/api/nothing-else")
+
+    samples = await scrape(http)
+
+    assert samples["http_requests_total", 'method="GET",route="unmatched",status="404"'] == 2
+
+
+async def test_responses_are_counted_per_status(http):
+    await create_invoice(http)
+    await http.get("/api/invoices/missing")
+    await http.post("/api/invoices", json={"client": "Acme"})
+
+    samples = await scrape(http)
+
+    assert samples["http_requests_total", 'method="GET",route="/api/invoices/{invoice_id}",status="404"'] == 1
+    assert {labels: value for (name, labels), value in samples.items()
+            if name == "http_requests_total" and 'route="/api/invoices"' in labels} == {
+        'method="POST",route="/api/invoices",status="200"': 1,
+        'method="POST",route="/api/invoices",status="422"': 1,
+    }
+
+
+async def test_latency_buckets_are_cumulative(http):
+    for _ in range(5):
+        await http.get("/api/clients")
+
+    samples = await scrape(http)
+
+    route = 'method="GET",route="/api/clients"'
+    counts = buckets(samples, route)
+    assert counts == sorted(counts)
+    assert counts[-1] == samples["http_request_duration_seconds_count", route] == 5
+    assert samples["http_request_duration_seconds_sum", route] > 0
+
+
+async def test_the_scrape_itself_is_in_flight(http):
+    samples = await scrape(http)
+
+    assert samples["http_requests_in_flight", 'method="GET",route="/metrics"'] == 1
@@ -0,0 +1,87 @@
+"""
+Microbenchmarks for the per-request model work in backend/models.py
+Covers model construction (from a create payload, which runs the id/date
+default factories, and from a stored document), serialize_doc, .dict()
+dumping and list response encoding at 1, 100 and 10,000 documents.
+
+    python -m pytest tests -q --bench                # compare with the baseline
+    python -m pytest tests -q --bench-save-baseline  # refresh the baseline
+"""
+
+import pytest
+
+from serialization import encode_list, serialize_doc
+from tests.factories import MODELS, make_docs, make_payloads, stored_fields
+
+pytestmark = pytest.mark.bench
+
+SIZES = (1, 100, 10_000)
+
+
+_docs = {}
+
+
+def docs_for(entity, count):
+    if (entity, count) not in _docs:
+        _docs[entity, count] = make_docs(entity, count)
+    return _docs[entity, count]
+
+
+@pytest.mark.parametrize("count", SIZES)
+@pytest.mark.parametrize("entity", MODELS)
+def test_construct_from_payload(bench, entity, count):
+    model, create_model, _ = MODELS[entity]
+    payloads = make_payloads(entity, count)
+
+    def construct():
+        return [model(**create_model(**payload).dict(), **stored_fields(entity, i))
+                for i, payload in enumerate(payloads)]
+
+    assert len(bench(construct)) == count
+
+
+@pytest.mark.parametrize("count", SIZES)
+@pytest.mark.parametrize("entity", MODELS)
+def test_construct_from_document(bench, entity, count):
+    model = MODELS[entity][0]
+    docs = [serialize_doc(dict(doc)) for doc in docs_for(entity, count)]
+
+    def construct():
+        return [model(**doc) for doc in docs]
+
+    assert len(bench(construct)) == count
+
+
+@pytest.mark.parametrize("count", SIZES)
+@pytest.mark.parametrize("entity", MODELS)
+def test_serialize_doc(bench, entity, count):
+    docs = docs_for(entity, count)
+
+    # serialize_doc rewrites _id in place, so every round gets fresh copies
+    def serialize(copies):
+        return [serialize_doc(doc) for doc in copies]
+
+    result = bench(serialize, setup=lambda: ([dict(doc) for doc in docs],))
+    assert all(isinstance(doc["_id"], str) for doc in result)
+
+
+@pytest.mark.parametrize("count", SIZES)
+@pytest.mark.parametrize("entity", MODELS)
+def test_dict_dump(bench, entity, count):
+    model = MODELS[entity][0]
+    instances = [model(**serialize_doc(dict(doc))) for doc in docs_for(entity, count)]
+
+    def dump():
+        return [instance.dict() for instance in instances]
+
+    assert len(bench(dump)) == count
+
+
+@pytest.mark.parametrize("count", SIZES)
+@pytest.mark.parametrize("entity", MODELS)
+def test_encode_list(bench, entity, count):
+    model = MODELS[entity][0]
+    docs = docs_for(entity, count)
+
+    body = bench(encode_list, model, docs)
+    assert body.startswith(b"[")
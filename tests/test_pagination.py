@@ -0,0 +1,82 @@
+"""
+Tests for keyset (cursor) pagination on the list endpoints
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Client
+from pagination import DEFAULT_PAGE_SIZE
+from tests.conftest import STORAGE_BACKENDS
+from tests.helpers import all_pages
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)]
+
+
+async def seed_clients(app, count=23):
+    # Written to storage directly, as the API always stamps join_date itself.
+    # Only three distinct join dates, so most pages end inside a run of ties.
+    start = datetime(2025, 1, 1)
+    clients = [
+        Client(name=f"Client {i}", email=f"client{i}@example.com", company="Acme",
+               join_date=start + timedelta(days=i % 3))
+        for i in range(count)
+    ]
+    assert await app.state.services.storage.clients.insert_many([client.dict() for client in clients]) == {}
+    return [client.id for client in clients]
+
+
+@pytest.mark.parametrize("sort, descending", [(None, True), ("-join_date", True), ("join_date", False)])
+async def test_cursor_pages_return_every_row_once_in_order(app, http, sort, descending):
+    ids = await seed_clients(app)
+
+    docs = await all_pages(http, "/api/clients", limit=5, **({"sort": sort} if sort else {}))
+
+    assert sorted(doc["id"] for doc in docs) == sorted(ids)
+    keys = [(doc["join_date"], doc["id"]) for doc in docs]
+    assert keys == sorted(keys, reverse=descending)
+
+
+async def test_last_page_has_no_cursor(app, http):
+    await seed_clients(app, count=10)
+
+    response = await http.get("/api/clients", params={"limit": 10})
+
+    assert len(response.json()) == 10
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_unpaged_calls_get_the_default_page_size(app, http):
+    await seed_clients(app, count=DEFAULT_PAGE_SIZE + 1)
+
+    response = await http.get("/api/clients")
+
+    assert len(response.json()) == DEFAULT_PAGE_SIZE
+    assert "X-Next-Cursor" in response.headers
+
+
+async def test_cursor_from_another_sort_is_rejected(app, http):
+    await seed_clients(app, count=10)
+    cursor = (await http.get("/api/clients", params={"limit": 5})).headers["X-Next-Cursor"]
+
+    response = await http.get("/api/clients", params={"limit": 5, "cursor": cursor, "sort": "join_date"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor does not match the requested sort"
+
+
+async def test_malformed_cursor_is_rejected(http):
+    response = await http.get("/api/clients", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_timezone_aware_range_bounds_are_accepted(app, http):
+    await seed_clients(app, count=6)
+
+    response = await http.get("/api/clients", params={"joined_from": "2025-01-02T01:00:00+02:00"})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 4
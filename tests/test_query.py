@@ -0,0 +1,58 @@
+"""
+Tests for server-side filtering and sorting on the list endpoints
+"""
+
+import pytest
+
+from tests.conftest import STORAGE_BACKENDS
+from tests.helpers import create_invoice
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)]
+
+
+async def seed_invoices(http):
+    for client, amount, status, due_date in [
+        ("Acme", 100, "pending", "2025-01-10"), ("Acme", 300, "paid", "2025-02-10"),
+        ("Beta", 200, "pending", "2025-03-10"), ("Beta", 400, "paid", "2025-04-10"),
+    ]:
+        await create_invoice(http, client=client, amount=amount, status=status, due_date=due_date)
+
+
+async def amounts(http, **params):
+    response = await http.get("/api/invoices", params=params)
+    assert response.status_code == 200, response.text
+    return [invoice["amount"] for invoice in response.json()]
+
+
+async def test_equality_filters_keep_the_default_newest_first_order(http):
+    await seed_invoices(http)
+
+    assert await amounts(http, status="paid") == [400, 300]
+    assert await amounts(http, client="Acme", status="pending") == [100]
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"sort": "amount"}, [100, 200, 300, 400]),
+    ({"sort": "-amount"}, [400, 300, 200, 100]),
+    ({"amount_min": 200, "amount_max": 300}, [300, 200]),
+    ({"amount_min": 200, "sort": "amount"}, [200, 300, 400]),
+    ({"due_date_from": "2025-02-01", "due_date_to": "2025-03-31", "sort": "due_date"}, [300, 200]),
+])
+async def test_sort_and_range_filters(http, params, expected):
+    await seed_invoices(http)
+
+    assert await amounts(http, **params) == expected
+
+
+@pytest.mark.parametrize("path, params, detail", [
+    ("/api/clients", {"sort": "email"}, "Cannot sort by email"),
+    ("/api/invoices", {"amount_min": 1, "due_date_from": "2025-01-01"}, "Only one range filter"),
+    ("/api/projects", {"budget_min": 1, "sort": "-created_date"}, "A range filter on budget requires sort=budget"),
+    ("/api/clients", {"company": "Acme", "sort": "name"}, "No index serves filters [company] sorted by name"),
+    ("/api/projects", {"status": "active", "client": "Acme"}, "No index serves filters [client, status]"),
+])
+async def test_unsupported_list_queries_are_400(http, path, params, detail):
+    response = await http.get(path, params=params)
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
@@ -0,0 +1,66 @@
+"""
+Tests for the incrementally maintained invoice rollups
+"""
+
+import pytest
+
+from tests.conftest import STORAGE_BACKENDS
+from tests.helpers import create_invoice
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)]
+
+
+async def rollups(http):
+    return {
+        kind: (await http.get("/api/analytics/invoices", params={"group": kind})).json()
+        for kind in ("month", "client", "client_month")
+    }
+
+
+async def test_incremental_rollups_match_a_rebuild(http):
+    invoices = [
+        await create_invoice(http, client=client, amount=amount, due_date=due_date)
+        for client, amount, due_date in [
+            ("Acme", 100, "2099-01-01"), ("Acme", 250, "2000-01-01"), ("Beta", 75, "2000-01-01"),
+            ("Beta", 40, "2099-01-01"), ("Gamma", 10, "2099-01-01"),
+        ]
+    ]
+    await http.patch(f"/api/invoices/{invoices[0]['id']}", json={"status": "paid", "amount": 120})
+    await http.put(f"/api/invoices/{invoices[3]['id']}", json={"client": "Acme"})
+    await http.delete(f"/api/invoices/{invoices[4]['id']}")
+    sweep = (await http.post("/api/admin/sweeper/run")).json()
+    assert sweep["updated"] == 2
+
+    incremental = await rollups(http)
+    await http.post("/api/admin/rollups/rebuild")
+    rebuilt = await rollups(http)
+
+    assert incremental == rebuilt
+    by_client = {row["client"]: row for row in rebuilt["client"]}
+    assert set(by_client) == {"Acme", "Beta"}
+    assert by_client["Acme"]["amount"] == 410
+    assert by_client["Acme"]["by_status"] == {
+        "paid": {"count": 1, "amount": 120},
+        "overdue": {"count": 1, "amount": 250},
+        "pending": {"count": 1, "amount": 40},
+    }
+
+
+async def test_statuses_are_rolled_up_whatever_their_characters(http):
+    invoices = [
+        await create_invoice(http, status=status, amount=amount)
+        for status, amount in [("on.hold", 10), ("$disputed", 20), ("100%", 30)]
+    ]
+    response = await http.patch(f"/api/invoices/{invoices[0]['id']}", json={"status": "paid"})
+    assert response.status_code == 200
+
+    incremental = await rollups(http)
+    await http.post("/api/admin/rollups/rebuild")
+    rebuilt = await rollups(http)
+
+    assert incremental == rebuilt
+    assert rebuilt["client"][0]["by_status"] == {
+        "paid": {"count": 1, "amount": 10},
+        "$disputed": {"count": 1, "amount": 20},
+        "100%": {"count": 1, "amount": 30},
+    }
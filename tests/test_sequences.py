@@ -0,0 +1,75 @@
+"""
+Tests for the invoice number sequence allocator and duplicate renumbering
+The renumbering tests need a real unique index build, so they only run on
+MongoDB (see conftest.py).
+"""
+
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+
+from indexes import ensure_indexes
+from sequences import SequenceAllocator, renumber_duplicates
+from tests.conftest import STORAGE_BACKENDS
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)
+async def test_concurrent_takes_across_leases_are_disjoint(storage):
+    # Several workers sharing one counter, with blocks small enough that
+    # most takes straddle a lease
+    allocators = [SequenceAllocator(storage.counters, "invoice_number", block_size=3) for _ in range(4)]
+    sizes = [random.Random(seed).randint(1, 5) for seed in range(80)]
+
+    results = await asyncio.gather(*(
+        allocators[i % len(allocators)].take(size) for i, size in enumerate(sizes)
+    ))
+
+    numbers = [int(number) for result in results for number in result]
+    assert [len(result) for result in results] == sizes
+    assert len(set(numbers)) == len(numbers) == sum(sizes)
+    assert all(result == sorted(result, key=int) for result in results)
+    assert max(numbers) <= (await storage.counters.get("invoice_number"))["seq"]
+
+
+async def test_take_formats_with_the_template(storage):
+    allocator = SequenceAllocator(storage.counters, "invoice_number", block_size=2, template="INV-{:06d}")
+
+    assert await allocator.take(3) == ["INV-000001", "INV-000002", "INV-000003"]
+    assert await allocator.next() == "INV-000004"
+
+
+async def seed_duplicates(storage):
+    collection = storage.invoices.collection
+    await collection.drop_index("invoice_number_unique")
+    for doc_id, number, day in [("a", "INV-1700000000", 3), ("b", "INV-1700000000", 1),
+                                ("c", "INV-1700000001", 2), ("d", "INV-1700000000", 2)]:
+        await collection.insert_one({"id": doc_id, "invoice_number": number,
+                                     "created_date": datetime(2025, 1, day)})
+    return collection
+
+
+@pytest.mark.parametrize("storage", ["mongo"], indirect=True)
+async def test_duplicates_are_renumbered_before_the_unique_index_builds(storage):
+    collection = await seed_duplicates(storage)
+    allocator = SequenceAllocator(storage.counters, "invoice_number", template="INV-{:06d}")
+
+    await ensure_indexes(collection.database, before_create={
+        ("invoices", "invoice_number_unique"): lambda: renumber_duplicates(storage.invoices, allocator),
+    })
+
+    numbers = {doc["id"]: doc["invoice_number"] async for doc in collection.find()}
+    # The oldest invoice keeps the number, the others get fresh ones in age order
+    assert numbers == {"a": "INV-000002", "b": "INV-1700000000", "c": "INV-1700000001", "d": "INV-000001"}
+    assert "invoice_number_unique" in await collection.index_information()
+
+
+@pytest.mark.parametrize("storage", ["mongo"], indirect=True)
+async def test_unique_index_over_duplicates_fails_loudly(storage):
+    collection = await seed_duplicates(storage)
+
+    with pytest.raises(RuntimeError, match="invoice_number_unique"):
+        await ensure_indexes(collection.database)
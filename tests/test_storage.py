@@ -0,0 +1,85 @@
+"""
+Tests for the reporting operations of the storage backends
+aging_groups, rollup_groups and summary are aggregation pipelines on MongoDB
+and computed in process on the in-memory store; both must give the same
+answers. The MongoDB runs need MONGO_TEST_URL (see conftest.py).
+"""
+
+from datetime import datetime
+
+import pytest
+
+from models import Client, Invoice, Project
+from tests.conftest import STORAGE_BACKENDS
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)]
+
+AS_OF = datetime(2025, 3, 1)
+
+
+@pytest.fixture
+async def seeded(storage):
+    clients = [Client(id="acme", name="Acme", email="acme@example.com"),
+               Client(id="beta", name="Beta", email="beta@example.com")]
+    projects = [
+        Project(id="p1", name="Website", client="Acme", budget=1000, start_date="2025-01-01",
+                created_date=datetime(2025, 1, 5)),
+        Project(id="p2", name="Shop", client="Acme", budget=500, start_date="2025-02-01",
+                created_date=datetime(2025, 2, 5)),
+    ]
+    invoices = [
+        Invoice(id="i1", invoice_number="INV-000001", client="Acme", project="Website", amount=100,
+                due_date="2025-02-20", created_date=datetime(2025, 1, 10)),
+        Invoice(id="i2", invoice_number="INV-000002", client="Acme", project="Website", amount=50,
+                due_date="2025-01-01", status="paid", created_date=datetime(2025, 1, 20)),
+        Invoice(id="i3", invoice_number="INV-000003", client="Acme", project="Shop", amount=30,
+                due_date="2024-12-15", status="overdue", created_date=datetime(2025, 2, 10)),
+        Invoice(id="i4", invoice_number="INV-000004", client="Beta", project="Logo", amount=20,
+                due_date="2025-04-01", created_date=datetime(2025, 2, 15)),
+    ]
+    for repository, models in ((storage.clients, clients), (storage.projects, projects),
+                               (storage.invoices, invoices)):
+        assert await repository.insert_many([model.dict() for model in models]) == {}
+    return storage
+
+
+async def test_summary_joins_projects_and_invoices_newest_first(seeded):
+    summary = await seeded.clients.summary("acme", seeded.projects, seeded.invoices)
+
+    assert summary["client"]["name"] == "Acme"
+    assert [project["id"] for project in summary["projects"]] == ["p2", "p1"]
+    assert [invoice["id"] for invoice in summary["invoices"]] == ["i3", "i2", "i1"]
+    assert (summary["total_invoiced"], summary["outstanding_balance"]) == (180, 130)
+
+
+async def test_summary_of_missing_client_is_none(seeded):
+    assert await seeded.clients.summary("missing", seeded.projects, seeded.invoices) is None
+
+
+async def test_aging_groups_cover_unpaid_invoices(seeded):
+    groups = await seeded.invoices.aging_groups(AS_OF)
+
+    by_client = sorted((g["_id"]["client"], g["_id"]["bucket"], g["amount"], g["count"]) for g in groups["by_client"])
+    totals = sorted((g["_id"], g["amount"], g["count"]) for g in groups["totals"])
+    assert by_client == [
+        ("Acme", "days_1_30", 100, 1),
+        ("Acme", "days_61_90", 30, 1),
+        ("Beta", "current", 20, 1),
+    ]
+    assert totals == [("current", 20, 1), ("days_1_30", 100, 1), ("days_61_90", 30, 1)]
+
+
+async def test_aging_groups_of_no_invoices_are_empty(storage):
+    assert await storage.invoices.aging_groups(AS_OF) == {"by_client": [], "totals": []}
+
+
+async def test_rollup_groups_by_client_month_and_status(seeded):
+    groups = await seeded.invoices.rollup_groups()
+
+    assert sorted((g["_id"]["client"], g["_id"]["month"], g["_id"]["status"], g["count"], g["amount"])
+                  for g in groups) == [
+        ("Acme", "2025-01", "paid", 1, 50),
+        ("Acme", "2025-01", "pending", 1, 100),
+        ("Acme", "2025-02", "overdue", 1, 30),
+        ("Beta", "2025-02", "pending", 1, 20),
+    ]
@@ -0,0 +1,63 @@
+"""
+Tests for the client summary endpoint
+"""
+
+import pytest
+
+from tests.conftest import STORAGE_BACKENDS
+from tests.helpers import create_invoice
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)]
+
+
+async def create(http, path, payload):
+    response = await http.post(path, json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_summary_of_missing_client_is_404(http):
+    response = await http.get("/api/clients/missing/summary")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Client not found"}
+
+
+async def test_summary_joins_the_clients_projects_and_invoices(http):
+    acme = await create(http, "/api/clients", {"name": "Acme", "email": "acme@example.com"})
+    await create(http, "/api/clients", {"name": "Beta", "email": "beta@example.com"})
+    website = await create(http, "/api/projects", {"name": "Website", "client": "Acme", "budget": 1000,
+                                                   "start_date": "2025-01-01"})
+    shop = await create(http, "/api/projects", {"name": "Shop", "client": "Acme", "budget": 500,
+                                                "start_date": "2025-02-01"})
+    await create(http, "/api/projects", {"name": "Logo", "client": "Beta", "budget": 200,
+                                         "start_date": "2025-02-01"})
+    first = await create_invoice(http, amount=100)
+    second = await create_invoice(http, amount=50, project="Shop")
+    await create_invoice(http, client="Beta", project="Logo", amount=999)
+
+    summary = (await http.get(f"/api/clients/{acme['id']}/summary")).json()
+
+    assert summary["client"]["id"] == acme["id"]
+    assert [project["id"] for project in summary["projects"]] == [shop["id"], website["id"]]
+    assert [invoice["id"] for invoice in summary["invoices"]] == [second["id"], first["id"]]
+
+
+async def test_outstanding_balance_counts_only_pending_and_overdue(http):
+    client = await create(http, "/api/clients", {"name": "Acme", "email": "acme@example.com"})
+    for amount, status in [(100, "pending"), (40, "overdue"), (250, "paid"), (7, "draft")]:
+        await create_invoice(http, amount=amount, status=status)
+    await create_invoice(http, client="Beta", amount=1000)
+
+    summary = (await http.get(f"/api/clients/{client['id']}/summary")).json()
+
+    assert (summary["total_invoiced"], summary["outstanding_balance"]) == (397, 140)
+
+
+async def test_summary_of_client_without_invoices_is_zero(http):
+    client = await create(http, "/api/clients", {"name": "Acme", "email": "acme@example.com"})
+
+    summary = (await http.get(f"/api/clients/{client['id']}/summary")).json()
+
+    assert (summary["projects"], summary["invoices"]) == ([], [])
+    assert (summary["total_invoiced"], summary["outstanding_balance"]) == (0, 0)
@@ -0,0 +1,95 @@
+"""
+Tests for the background overdue-invoice sweeper
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from models import Invoice
+from sweeper import OverdueSweeper
+from tests.conftest import STORAGE_BACKENDS
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("storage", STORAGE_BACKENDS, indirect=True)]
+
+TODAY = "2025-06-01"
+
+
+async def seed_past_due(invoices, count):
+    # Due on consecutive days from 2025-01-01, so the sweep reads them in id order
+    docs = [
+        Invoice(id=f"i{i}", invoice_number=f"INV-{i:06d}", client="Acme", project="Website", amount=10,
+                due_date=(date(2025, 1, 1) + timedelta(days=i)).isoformat()).dict()
+        for i in range(count)
+    ]
+    assert await invoices.insert_many(docs) == {}
+
+
+def recorder(reported):
+    async def on_updated(invoice_docs):
+        assert all(doc["status"] == "pending" for doc in invoice_docs)
+        reported.extend(doc["id"] for doc in invoice_docs)
+    return on_updated
+
+
+async def statuses(invoices, count):
+    return [(await invoices.get(f"i{i}"))["status"] for i in range(count)]
+
+
+async def test_sweep_flips_every_past_due_invoice_in_batches(storage):
+    await seed_past_due(storage.invoices, 7)
+    reported = []
+    sweeper = OverdueSweeper(storage.invoices, on_updated=recorder(reported), batch_size=3)
+
+    run = await sweeper.run_once(today=TODAY)
+
+    assert (run["batches"], run["matched"], run["updated"], run["error"]) == (3, 7, 7, None)
+    assert sorted(reported) == [f"i{i}" for i in range(7)]
+    assert set(await statuses(storage.invoices, 7)) == {"overdue"}
+
+
+async def test_invoice_paid_during_the_sweep_neither_reported_nor_ends_it(storage, monkeypatch):
+    await seed_past_due(storage.invoices, 6)
+    update_many = storage.invoices.update_many
+    paid = []
+
+    async def pay_one_first(ids, changes, only_if=None):
+        if not paid:
+            paid.append(ids[0])
+            await storage.invoices.update(ids[0], {"status": "paid"})
+        return await update_many(ids, changes, only_if)
+
+    monkeypatch.setattr(storage.invoices, "update_many", pay_one_first)
+    reported = []
+    sweeper = OverdueSweeper(storage.invoices, on_updated=recorder(reported), batch_size=3)
+
+    run = await sweeper.run_once(today=TODAY)
+
+    assert (run["batches"], run["updated"]) == (2, 5)
+    assert sorted(reported) == ["i1", "i2", "i3", "i4", "i5"]
+    assert await statuses(storage.invoices, 6) == ["paid"] + ["overdue"] * 5
+
+
+async def test_concurrent_sweeps_report_each_invoice_once(storage, monkeypatch):
+    # The sweeper of another worker flips the first three invoices between
+    # this sweep's read and its update
+    await seed_past_due(storage.invoices, 6)
+    reported, reported_elsewhere = [], []
+    sweeper = OverdueSweeper(storage.invoices, on_updated=recorder(reported), batch_size=10)
+    other_sweeper = OverdueSweeper(storage.invoices, on_updated=recorder(reported_elsewhere), batch_size=10)
+    update_many = storage.invoices.update_many
+    raced = []
+
+    async def other_sweep_first(ids, changes, only_if=None):
+        if not raced:
+            raced.append(True)
+            await other_sweeper.run_once(today="2025-01-04")
+        return await update_many(ids, changes, only_if)
+
+    monkeypatch.setattr(storage.invoices, "update_many", other_sweep_first)
+
+    run = await sweeper.run_once(today=TODAY)
+
+    assert run["updated"] == 3
+    assert sorted(reported_elsewhere) == ["i0", "i1", "i2"]
+    assert sorted(reported) == ["i3", "i4", "i5"]
@@ -0,0 +1,53 @@
+"""
+Tests for the PUT and PATCH update endpoints
+"""
+
+import pytest
+
+from tests.helpers import create_invoice
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_put_returns_the_updated_document(http):
+    invoice = await create_invoice(http, amount=100)
+
+    response = await http.put(f"/api/invoices/{invoice['id']}", json={"amount": 150})
+
+    assert response.status_code == 200
+    assert response.json() == {**invoice, "amount": 150}
+
+
+async def test_patch_returns_only_changed_fields(http):
+    invoice = await create_invoice(http, amount=100)
+
+    response = await http.patch(f"/api/invoices/{invoice['id']}", json={"amount": 100, "status": "paid"})
+
+    assert response.status_code == 200
+    assert response.json() == {"id": invoice["id"], "status": "paid"}
+    assert (await http.get(f"/api/invoices/{invoice['id']}")).json()["status"] == "paid"
+
+
+async def test_patch_without_fields_is_400(http):
+    invoice = await create_invoice(http)
+
+    response = await http.patch(f"/api/invoices/{invoice['id']}", json={})
+
+    assert response.status_code == 400
+
+
+async def test_patch_of_missing_document_is_404(http):
+    response = await http.patch("/api/clients/missing", json={"name": "New name"})
+
+    assert response.status_code == 404
+
+
+async def test_project_status_change_updates_the_dashboard(http):
+    project = {"name": "Website", "client": "Acme", "budget": 1000, "start_date": "2025-01-01"}
+    project_id = (await http.post("/api/projects", json=project)).json()["id"]
+    assert (await http.get("/api/dashboard")).json()["active_projects"] == 1
+
+    response = await http.patch(f"/api/projects/{project_id}", json={"status": "completed"})
+
+    assert response.json() == {"id": project_id, "status": "completed"}
+    assert (await http.get("/api/dashboard")).json()["active_projects"] == 0